@@ -2,9 +2,15 @@ import os
 import sys
 import logging
 import re
-from typing import Dict, Any, List, Optional
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Union
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
 import json
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -13,24 +19,120 @@ logger = logging.getLogger(__name__)
 
 _llm_utils_available = False
 try:
-    from utils.llm_utils import call_ollama_llm
+    from utils.llm_utils import OLLAMA_HEADERS, call_ollama_llm, new_ollama_adapter
     _llm_utils_available = True
     logger.info("LLM utility 'call_ollama_llm' imported successfully.")
 except ImportError:
     logger.warning("LLM utility 'call_ollama_llm' not found. LLM-based classification will be unavailable.")
 
+from utils import json_utils
+
+_ahocorasick_available = False
+try:
+    import ahocorasick
+    _ahocorasick_available = True
+except ImportError:
+    logger.info("pyahocorasick not installed; rule-based classification will count keywords one at a time.")
+
+# Key-information extraction patterns, compiled once at import time.
+_INVOICE_NUM_RE = re.compile(r'(?:invoice|bill)\s*(?:#|no\.?|num(?:ber)?\s*)?([a-z0-9\-/_]+)', re.IGNORECASE)
+_AMOUNT_RE = re.compile(r'(?:total|amount|subtotal|balance due|net amount)\s*:?\s*(?:usd|eur|gbp|\$|€|£)?\s*([\d,]+\.?\d{0,2})', re.IGNORECASE)
+_DUE_DATE_RE = re.compile(r'(?:due\s*date|payment\s*due|due)\s*:?\s*(\d{1,2}[/\-.]\d{1,2}[/\-.]\d{2,4}|\d{4}[/\-.]\d{1,2}[/\-.]\d{1,2})', re.IGNORECASE)
+_PO_NUM_RE = re.compile(r'(?:purchase\s*order|po)\s*(?:#|no\.?|num(?:ber)?\s*)?([a-z0-9\-/_]+)', re.IGNORECASE)
+_VENDOR_RE = re.compile(r'(?:vendor|supplier|sold\s*to|ship\s*to)\s*:?\s*([^\n\r]+)', re.IGNORECASE)
+
+_CATEGORY_DESCRIPTIONS = """\
+- INVOICE: Bills, invoices, payment requests
+- QUOTE_REQUEST: Quotation requests, estimates, proposals
+- CONTRACT: Agreements, contracts, legal documents
+- PURCHASE_ORDER: Purchase orders, procurement documents
+- RECEIPT: Payment confirmations, receipts, sales slips
+- GENERAL_INQUIRY: General questions, support requests, inquiries, informal communications"""
+
+# LLM prompt templates, built once at import time and filled with `str.format_map`.
+# Literal JSON braces are doubled so they survive formatting.
+_CLASSIFIER_PROMPT = """
+Analyze the following document text and classify it into one of these categories:
+""" + _CATEGORY_DESCRIPTIONS + """
+
+Document text:
+{text}
+
+Respond with ONLY a strict JSON object in this format. Ensure keys are exactly as specified.
+{{
+    "document_type": "CATEGORY_NAME",
+    "confidence": 0.85,
+    "reasoning": "Brief explanation of why this classification was chosen"
+}}
+"""
+
+_BATCH_CLASSIFIER_PROMPT = """
+Classify each of the following {count} documents into one of these categories:
+""" + _CATEGORY_DESCRIPTIONS + """
+
+Documents:
+{documents}
+
+Respond with ONLY a strict JSON object whose "results" array contains exactly {count} objects,
+one per document, in the same order as the documents above. Ensure keys are exactly as specified.
+{{
+    "results": [
+        {{
+            "document_type": "CATEGORY_NAME",
+            "confidence": 0.85,
+            "reasoning": "Brief explanation of why this classification was chosen"
+        }}
+    ]
+}}
+"""
+
 class ClassifierAgent:
-    def __init__(self, ollama_url: str = "http://localhost:11434"):
+    def __init__(self, ollama_url: str = "http://localhost:11434", preload: bool = True):
         """
         Initializes the ClassifierAgent.
 
         Args:
             ollama_url (str): The URL of the Ollama server for LLM interactions.
+            preload (bool): If True and Ollama is reachable, loads the model into memory right
+                            away so the first classification does not pay the cold-start cost.
         """
         self.agent_name = "Classifier_Agent"
         self.ollama_url = ollama_url
         self.model_name = "mistral:latest"
         self.llm_utils_available = _llm_utils_available
+        # Number of documents sent per batched LLM request; returns diminish beyond ~8.
+        self.batch_size = 6
+        # Deterministic, length-capped decoding: the expected JSON answer is short.
+        self.llm_options = {'temperature': 0, 'num_predict': 120}
+
+        # Pooled keep-alive session shared by the health check and all LLM calls,
+        # so consecutive requests reuse the connection instead of reconnecting. The llm_utils
+        # adapter retries transient failures (connection resets, 502/503/504) and honours
+        # OLLAMA_SOCKET.
+        self.session = requests.Session()
+        if _llm_utils_available:
+            adapter = new_ollama_adapter(pool_connections=10, pool_maxsize=10)
+        else:
+            adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # Same headers as llm_utils: uncompressed responses unless OLLAMA_REMOTE=1.
+        self.session.headers.update(OLLAMA_HEADERS if _llm_utils_available else {'Connection': 'keep-alive'})
+
+        # Cached Ollama health-check result, reused for `connection_check_ttl` seconds.
+        self.connection_check_ttl = 30.0
+        self._ollama_ok: Optional[bool] = None
+        self._ollama_ok_ts: float = 0.0
+
+        # Rule-based scoring only looks at the head of a document; the type signal almost
+        # always appears on the first page. Extraction still runs on the full text.
+        self.rule_scan_limit = 4096
+
+        # LRU cache of LLM classification results, keyed by a digest of the input text.
+        # Guarded by a lock because `classify_many` calls `classify_document` from worker threads.
+        self._cache: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+        self._cache_max = 512
+        self._cache_lock = threading.Lock()
 
         self.document_types = {
             'INVOICE': {
@@ -59,12 +161,88 @@ class ClassifierAgent:
             }
         }
 
+        # Rule-based scores are kept in a plain list indexed by document type position;
+        # the per-type dict is only assembled for the returned result.
+        self._type_names = list(self.document_types)
+        self._type_index = {doc_type: i for i, doc_type in enumerate(self._type_names)}
+        # Document types an LLM classification may name.
+        self._valid_types = frozenset(self.document_types)
+
+        # Key-information extractors per document type; types without one get no extraction.
+        self._extractors = {
+            'INVOICE': self._extract_invoice,
+            'PURCHASE_ORDER': self._extract_po
+        }
+
+        # Compile the scoring patterns once, indexed like `_type_names`. They are matched against
+        # case-folded text, so no IGNORECASE flag (and its per-character case folding) is needed.
+        self._compiled_patterns = [
+            [re.compile(pattern) for pattern in config['patterns']]
+            for config in self.document_types.values()
+        ]
+
+        # Map every keyword to the indices of the types it scores for; a keyword shared by
+        # several types (e.g. 'request') counts for all of them.
+        keyword_types: Dict[str, List[int]] = {}
+        for doc_type, config in self.document_types.items():
+            for keyword in config['keywords']:
+                keyword_types.setdefault(keyword.casefold(), []).append(self._type_index[doc_type])
+
+        # Build a single Aho-Corasick automaton over every keyword so that rule-based
+        # scoring finds all keyword occurrences in one pass over the text.
+        self._keyword_automaton = None
+        self._keyword_re = None
+        if _ahocorasick_available:
+            self._keyword_automaton = ahocorasick.Automaton()
+            for keyword, type_indices in keyword_types.items():
+                self._keyword_automaton.add_word(keyword, tuple(type_indices))
+            self._keyword_automaton.make_automaton()
+        else:
+            # Without pyahocorasick, one alternation regex still finds all keywords in a single
+            # scan. The lookahead reports the longest keyword starting at each position; every
+            # shorter keyword that is a prefix of it matches there too, so it is credited as well.
+            longest_first = sorted(keyword_types, key=len, reverse=True)
+            self._keyword_re = re.compile('(?=(' + '|'.join(map(re.escape, longest_first)) + '))')
+            self._keyword_credits = {
+                keyword: [type_index for other, type_indices in keyword_types.items() if keyword.startswith(other)
+                          for type_index in type_indices]
+                for keyword in keyword_types
+            }
+
+        if preload and self.check_ollama_connection():
+            self.preload_model()
+
+    def preload_model(self) -> bool:
+        """
+        Warm-loads the classification model on the Ollama server.
+
+        Sends an empty generate request with `keep_alive=-1`, which makes Ollama load the model
+        and keep it resident instead of unloading it after the idle timeout.
+
+        Returns:
+            bool: True if the model was loaded, False otherwise.
+        """
+        try:
+            response = self.session.post(
+                f"{self.ollama_url}/api/generate",
+                json={"model": self.model_name, "prompt": "", "keep_alive": -1, "options": {"num_predict": 1}},
+                timeout=60
+            )
+            response.raise_for_status()
+            logger.info("Model '%s' preloaded on the Ollama server.", self.model_name)
+            return True
+        except requests.exceptions.RequestException as e:
+            logger.warning("Could not preload model '%s': %s.", self.model_name, e)
+            return False
+
     def check_ollama_connection(self) -> bool:
         """
         Verifies connectivity to the Ollama server.
 
         This method attempts to connect to the configured Ollama URL to ensure the LLM service
         is operational and accessible. It is only executed if LLM utilities are available.
+        The result is cached for `connection_check_ttl` seconds so that consecutive
+        classifications do not each pay for a probe request.
 
         Returns:
             bool: True if the Ollama server is accessible, False otherwise.
@@ -73,22 +251,44 @@ class ClassifierAgent:
             logger.warning("LLM utility not available; skipping Ollama connection check.")
             return False
 
+        now = time.monotonic()
+        if self._ollama_ok is not None and now - self._ollama_ok_ts < self.connection_check_ttl:
+            return self._ollama_ok
+
+        self._ollama_ok = self._probe_ollama_connection()
+        self._ollama_ok_ts = now
+        return self._ollama_ok
+
+    def invalidate_connection_check(self):
+        """
+        Discards the cached health-check result so the next call re-probes the Ollama server.
+        """
+        self._ollama_ok = None
+        self._ollama_ok_ts = 0.0
+
+    def _probe_ollama_connection(self) -> bool:
+        """
+        Sends the actual health-check request to the Ollama server's `/api/tags` endpoint.
+
+        Returns:
+            bool: True if the Ollama server responded with HTTP 200, False otherwise.
+        """
         try:
-            response = requests.get(f"{self.ollama_url}/api/tags", timeout=5)
+            response = self.session.get(f"{self.ollama_url}/api/tags", timeout=5)
             if response.status_code == 200:
                 logger.info("Ollama server is accessible.")
                 return True
             else:
-                logger.warning(f"Ollama server returned status: {response.status_code}.")
+                logger.warning("Ollama server returned status: %s.", response.status_code)
                 return False
         except requests.exceptions.ConnectionError:
-            logger.warning(f"Ollama server connection refused or host unreachable at {self.ollama_url}.")
+            logger.warning("Ollama server connection refused or host unreachable at %s.", self.ollama_url)
             return False
         except requests.exceptions.Timeout:
-            logger.warning(f"Ollama server connection timed out after 5 seconds at {self.ollama_url}.")
+            logger.warning("Ollama server connection timed out after 5 seconds at %s.", self.ollama_url)
             return False
         except Exception as e:
-            logger.warning(f"Ollama server accessibility check failed: {str(e)}.")
+            logger.warning("Ollama server accessibility check failed: %s.", e)
             return False
 
     def classify_with_llm(self, text: str) -> Optional[Dict[str, Any]]:
@@ -112,53 +312,170 @@ class ClassifierAgent:
             return None
 
         try:
-            # Construct the prompt for the LLM, limiting text length to fit context window.
-            prompt = f"""
-            Analyze the following document text and classify it into one of these categories:
-            - INVOICE: Bills, invoices, payment requests
-            - QUOTE_REQUEST: Quotation requests, estimates, proposals
-            - CONTRACT: Agreements, contracts, legal documents
-            - PURCHASE_ORDER: Purchase orders, procurement documents
-            - RECEIPT: Payment confirmations, receipts, sales slips
-            - GENERAL_INQUIRY: General questions, support requests, inquiries, informal communications
-
-            Document text:
-            {text[:2000]}
-
-            Respond with ONLY a strict JSON object in this format. Ensure keys are exactly as specified.
-            {{
-                "document_type": "CATEGORY_NAME",
-                "confidence": 0.85,
-                "reasoning": "Brief explanation of why this classification was chosen"
-            }}
-            """
-
-            response_text = call_ollama_llm(prompt, self.model_name)
+            # Fill the prompt template, limiting text length to fit context window.
+            prompt = _CLASSIFIER_PROMPT.format_map({'text': text[:2000]})
+
+            response_text = call_ollama_llm(prompt, self.model_name, session=self.session,
+                                            stream=True, stop_after_json=True,
+                                            options=self.llm_options, format="json")
 
             if response_text:
                 try:
-                    classification_result = json.loads(response_text)
+                    classification_result = json_utils.loads(response_text)
                     # Validate the essential keys and their types in the LLM's JSON response.
-                    if (all(key in classification_result and isinstance(classification_result[key], (str, float, int))
-                            for key in ['document_type', 'confidence']) and 'reasoning' in classification_result):
+                    if self._has_llm_classification_fields(classification_result):
 
-                        if classification_result['document_type'] in self.document_types.keys():
-                            logger.info(f"LLM classification successful: {classification_result['document_type']} (confidence: {classification_result['confidence']:.2f})")
+                        if classification_result['document_type'] in self._valid_types:
+                            logger.info("LLM classification successful: %s (confidence: %s)",
+                                        classification_result['document_type'], classification_result['confidence'])
                             return classification_result
                         else:
-                            logger.warning(f"LLM returned an invalid document_type: '{classification_result['document_type']}'. Falling back to rule-based.")
+                            logger.warning("LLM returned an invalid document_type: '%s'. Falling back to rule-based.",
+                                           classification_result['document_type'])
                             return None
                     else:
-                        logger.warning(f"LLM response missing required fields or has invalid types: {response_text}. Falling back to rule-based.")
+                        logger.warning("LLM response missing required fields or has invalid types: %s. Falling back to rule-based.", response_text)
                         return None
-                except json.JSONDecodeError:
-                    logger.warning(f"Could not parse LLM JSON response: '{response_text}'. Falling back to rule-based.")
+                except json_utils.JSONDecodeError:
+                    logger.warning("Could not parse LLM JSON response: '%s'. Falling back to rule-based.", response_text)
                     return None
             return None
+        except requests.exceptions.ConnectionError as e:
+            # The server went away since the last health check; force a re-probe next time.
+            self.invalidate_connection_check()
+            logger.error("Lost connection to Ollama during LLM classification: %s. Falling back to rule-based.", e)
+            return None
         except Exception as e:
-            logger.error(f"LLM classification attempt failed unexpectedly: {str(e)}. Falling back to rule-based.")
+            logger.error("LLM classification attempt failed unexpectedly: %s. Falling back to rule-based.", e)
             return None
 
+    @staticmethod
+    def _has_llm_classification_fields(candidate: Any) -> bool:
+        """
+        Checks that a parsed LLM classification is a dict with the expected keys and value types.
+
+        Args:
+            candidate (Any): The parsed JSON value returned by the LLM for a single document.
+
+        Returns:
+            bool: True if 'document_type', 'confidence' and 'reasoning' are present and well-typed.
+        """
+        return (isinstance(candidate, dict)
+                and all(key in candidate and isinstance(candidate[key], (str, float, int))
+                        for key in ['document_type', 'confidence'])
+                and 'reasoning' in candidate)
+
+    def _is_valid_llm_classification(self, candidate: Any) -> bool:
+        """
+        Checks that a parsed LLM classification has the expected keys, types and a known document type.
+
+        Args:
+            candidate (Any): The parsed JSON value returned by the LLM for a single document.
+
+        Returns:
+            bool: True if the classification can be used as-is, False otherwise.
+        """
+        return (self._has_llm_classification_fields(candidate)
+                and candidate['document_type'] in self._valid_types)
+
+    def _classify_with_rules_fallback(self, text: str) -> Dict[str, Any]:
+        """
+        Runs rule-based classification and shapes it like an LLM classification.
+
+        Args:
+            text (str): The text content of the document to classify.
+
+        Returns:
+            Dict[str, Any]: 'document_type', 'confidence', 'reasoning' and 'method_used' ('Rule-based').
+        """
+        rule_result = self.classify_with_rules(text)
+        return {
+            'document_type': rule_result['document_type'],
+            'confidence': rule_result['confidence'],
+            'reasoning': rule_result['reasoning'],
+            'method_used': 'Rule-based'
+        }
+
+    def classify_batch(self, texts: List[str], use_llm: bool = True) -> List[Dict[str, Any]]:
+        """
+        Classifies several documents with a single LLM request per group (batch prompting).
+
+        Documents are sent in groups of `self.batch_size`, each prefixed with `[DOC i]` and
+        truncated, so the fixed instruction header is processed once per group instead of once
+        per document. Any entry the LLM does not classify validly falls back to rule-based
+        classification individually.
+
+        Args:
+            texts (List[str]): The text contents of the documents to classify.
+            use_llm (bool): If False, skips the LLM and classifies every document with rules.
+
+        Returns:
+            List[Dict[str, Any]]: One classification per input text, in input order, each containing
+                                  'document_type', 'confidence', 'reasoning' and 'method_used'.
+        """
+        classifications = []
+        for start in range(0, len(texts), self.batch_size):
+            group = texts[start:start + self.batch_size]
+            llm_results = self._classify_group_with_llm(group) if use_llm else [None] * len(group)
+
+            for text, llm_result in zip(group, llm_results):
+                if llm_result is not None:
+                    classifications.append(dict(llm_result, method_used='LLM'))
+                else:
+                    classifications.append(self._classify_with_rules_fallback(text))
+
+        return classifications
+
+    def _classify_group_with_llm(self, texts: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Sends one group of documents to the LLM in a single numbered prompt.
+
+        Args:
+            texts (List[str]): The documents of this group (at most `self.batch_size`).
+
+        Returns:
+            List[Optional[Dict[str, Any]]]: A validated classification per document, or None for
+                                            every entry that was missing or malformed.
+        """
+        failed = [None] * len(texts)
+        if not self.llm_utils_available or not texts:
+            return failed
+
+        try:
+            documents = "\n\n".join(f"[DOC {i}]\n{text[:1500]}" for i, text in enumerate(texts, 1))
+            prompt = _BATCH_CLASSIFIER_PROMPT.format_map({'count': len(texts), 'documents': documents})
+
+            # The JSON grammar only allows an object at the top level, hence the "results" wrapper.
+            options = dict(self.llm_options, num_predict=self.llm_options['num_predict'] * len(texts))
+            response_text = call_ollama_llm(prompt, self.model_name, session=self.session,
+                                            stream=True, stop_after_json=True,
+                                            options=options, format="json")
+            if not response_text:
+                return failed
+
+            parsed = json_utils.loads(response_text)
+            # The prompt asks for {"results": [...]}; a bare array is accepted as well.
+            if isinstance(parsed, dict):
+                parsed = parsed.get('results')
+            if not isinstance(parsed, list) or len(parsed) != len(texts):
+                logger.warning("Batched LLM response did not contain %d entries. Falling back to rule-based.", len(texts))
+                return failed
+
+            validated = [entry if self._is_valid_llm_classification(entry) else None for entry in parsed]
+            logger.info("Batched LLM classification: %d/%d documents classified.",
+                        len(validated) - validated.count(None), len(texts))
+            return validated
+        except json_utils.JSONDecodeError:
+            logger.warning("Could not parse batched LLM JSON response. Falling back to rule-based.")
+            return failed
+        except requests.exceptions.ConnectionError as e:
+            self.invalidate_connection_check()
+            logger.error("Lost connection to Ollama during batched LLM classification: %s. Falling back to rule-based.", e)
+            return failed
+        except Exception as e:
+            logger.error("Batched LLM classification attempt failed unexpectedly: %s. Falling back to rule-based.", e)
+            return failed
+
     def classify_with_rules(self, text: str) -> Dict[str, Any]:
         """
         Performs rule-based document classification using predefined keywords and regex patterns.
@@ -173,37 +490,44 @@ class ClassifierAgent:
             Dict[str, Any]: A dictionary containing the 'document_type', 'confidence',
                             'reasoning', and the calculated 'scores' for each type.
         """
-        text_lower = text.lower()
-        scores = {}
+        # A single case-folded copy of the document head serves both the keyword and the
+        # pattern pass; keywords are stored folded and the patterns are compiled without IGNORECASE.
+        folded_text = text[:self.rule_scan_limit].casefold()
+        scores = [0] * len(self._type_names)
+
+        if self._keyword_automaton is not None:
+            for _, type_indices in self._keyword_automaton.iter(folded_text):
+                for type_index in type_indices:
+                    scores[type_index] += 2
+        else:
+            for match in self._keyword_re.finditer(folded_text):
+                for type_index in self._keyword_credits[match.group(1)]:
+                    scores[type_index] += 2
 
-        for doc_type, config in self.document_types.items():
-            score = 0
-            for keyword in config['keywords']:
-                count = text_lower.count(keyword.lower())
-                score += count * 2
-            for pattern in config['patterns']:
-                matches = len(re.findall(pattern, text_lower, re.IGNORECASE))
-                score += matches * 3
-            scores[doc_type] = score
-
-        if not scores or max(scores.values()) == 0:
+        for type_index, patterns in enumerate(self._compiled_patterns):
+            for pattern in patterns:
+                scores[type_index] += len(pattern.findall(folded_text)) * 3
+
+        max_score = max(scores)
+        if max_score == 0:
             # Assign a default type and low confidence if no matches are found.
             best_type = 'GENERAL_INQUIRY'
             confidence = 0.3
         else:
-            best_type = max(scores, key=scores.get)
-            max_score = scores[best_type]
-            total_score = sum(scores.values())
+            # list.index returns the first maximum, matching the dict-order tie-breaking of max().
+            best_type = self._type_names[scores.index(max_score)]
+            total_score = sum(scores)
             # Calculate confidence as a ratio, capping it to indicate rule-based limitations.
             confidence = min(0.9, max_score / max(total_score, 1))
 
-        logger.info(f"Rule-based classification: {best_type} (confidence: {confidence:.2f}). Scores: {scores}")
+        type_scores = dict(zip(self._type_names, scores))
+        logger.info("Rule-based classification: %s (confidence: %.2f). Scores: %s", best_type, confidence, type_scores)
 
         return {
             'document_type': best_type,
             'confidence': round(confidence, 2),
             'reasoning': 'Rule-based classification based on keyword and pattern matching',
-            'scores': scores
+            'scores': type_scores
         }
 
     def extract_key_information(self, text: str, document_type: str) -> Dict[str, Any]:
@@ -220,55 +544,71 @@ class ClassifierAgent:
         Returns:
             Dict[str, Any]: A dictionary containing the extracted key-value pairs.
         """
-        extracted_info = {}
-        text_lower = text.lower()
+        extractor = self._extractors.get(document_type)
+        if extractor is None:
+            return {}
 
         try:
-            if document_type == 'INVOICE':
-                invoice_num_match = re.search(r'(?:invoice|bill)\s*(?:#|no\.?|num(?:ber)?\s*)?([a-z0-9\-/_]+)', text_lower, re.IGNORECASE)
-                amount_match = re.search(r'(?:total|amount|subtotal|balance due|net amount)\s*:?\s*(?:usd|eur|gbp|\$|€|£)?\s*([\d,]+\.?\d{0,2})', text_lower, re.IGNORECASE)
-                due_date_match = re.search(r'(?:due\s*date|payment\s*due|due)\s*:?\s*(\d{1,2}[/\-.]\d{1,2}[/\-.]\d{2,4}|\d{4}[/\-.]\d{1,2}[/\-.]\d{1,2})', text_lower, re.IGNORECASE)
-
-                extracted_info.update({
-                    'invoice_number': invoice_num_match.group(1).strip() if invoice_num_match else None,
-                    'amount': amount_match.group(1).replace(',', '') if amount_match else None,
-                    'due_date': due_date_match.group(1).strip() if due_date_match else None
-                })
+            return extractor(text)
+        except Exception as e:
+            logger.warning("Key information extraction failed for type '%s': %s", document_type, e)
+            return {}
 
-            elif document_type == 'PURCHASE_ORDER':
-                po_num_match = re.search(r'(?:purchase\s*order|po)\s*(?:#|no\.?|num(?:ber)?\s*)?([a-z0-9\-/_]+)', text_lower, re.IGNORECASE)
-                vendor_match = re.search(r'(?:vendor|supplier|sold\s*to|ship\s*to)\s*:?\s*([^\n\r]+)', text_lower, re.IGNORECASE)
+    @staticmethod
+    def _extract_invoice(text: str) -> Dict[str, Any]:
+        """
+        Extracts the invoice number, amount and due date from an invoice.
 
-                extracted_info.update({
-                    'po_number': po_num_match.group(1).strip() if po_num_match else None,
-                    'vendor': vendor_match.group(1).strip() if vendor_match else None
-                })
-        except Exception as e:
-            logger.warning(f"Key information extraction failed for type '{document_type}': {str(e)}")
+        Args:
+            text (str): The document text from which to extract information.
 
-        return extracted_info
+        Returns:
+            Dict[str, Any]: 'invoice_number', 'amount' and 'due_date' (None when not found).
+        """
+        invoice_num_match = _INVOICE_NUM_RE.search(text)
+        amount_match = _AMOUNT_RE.search(text)
+        due_date_match = _DUE_DATE_RE.search(text)
 
-    def classify_document(self, text: str) -> Dict[str, Any]:
+        return {
+            'invoice_number': invoice_num_match.group(1).strip() if invoice_num_match else None,
+            'amount': amount_match.group(1).replace(',', '') if amount_match else None,
+            'due_date': due_date_match.group(1).strip() if due_date_match else None
+        }
+
+    @staticmethod
+    def _extract_po(text: str) -> Dict[str, Any]:
         """
-        The primary method to classify a given document text.
+        Extracts the purchase order number and vendor from a purchase order.
 
-        This method attempts LLM-based classification first. If the LLM is unavailable,
-        unresponsive, or provides an invalid response, it falls back to rule-based classification.
-        After classification, it extracts key information based on the identified document type.
+        Args:
+            text (str): The document text from which to extract information.
+
+        Returns:
+            Dict[str, Any]: 'po_number' and 'vendor' (None when not found).
+        """
+        po_num_match = _PO_NUM_RE.search(text)
+        vendor_match = _VENDOR_RE.search(text)
+
+        return {
+            'po_number': po_num_match.group(1).strip() if po_num_match else None,
+            'vendor': vendor_match.group(1).strip() if vendor_match else None
+        }
+
+    def _new_result(self, timestamp: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Builds the default (unsuccessful) result dictionary for a single classification.
 
         Args:
-            text (str): The document text to be classified.
+            timestamp (Optional[str]): ISO timestamp to record; batch callers pass one shared
+                                       value instead of formatting the current time per document.
 
         Returns:
-            Dict[str, Any]: A comprehensive dictionary detailing the classification result,
-                            including success status, agent name, timestamp, document type,
-                            confidence, method used, reasoning, extracted information, and
-                            any error messages.
+            Dict[str, Any]: The result skeleton populated by `classify_document` and `classify_documents`.
         """
-        result = {
+        return {
             'success': False,
             'agent': self.agent_name,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': timestamp or datetime.now().isoformat(),
             'document_type': None,
             'confidence': 0.0,
             'method_used': None,
@@ -277,6 +617,79 @@ class ClassifierAgent:
             'error_message': None
         }
 
+    @staticmethod
+    def _cache_key(text: str) -> bytes:
+        """Returns the cache key of a document text (a 16-byte BLAKE2b digest)."""
+        return hashlib.blake2b(text.encode('utf-8', 'ignore'), digest_size=16).digest()
+
+    def _get_cached_result(self, key: bytes, timestamp: str) -> Optional[Dict[str, Any]]:
+        """
+        Looks up a cached classification result and marks it as recently used.
+
+        Args:
+            key (bytes): The cache key produced by `_cache_key`.
+            timestamp (str): ISO timestamp stamped on the returned copy.
+
+        Returns:
+            Optional[Dict[str, Any]]: A copy of the cached result with a fresh timestamp,
+                                      or None on a cache miss.
+        """
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is None:
+                return None
+            self._cache.move_to_end(key)
+        return dict(cached, extracted_info=dict(cached['extracted_info']), timestamp=timestamp)
+
+    def _store_cached_result(self, key: bytes, result: Dict[str, Any]):
+        """
+        Stores a classification result, evicting the least recently used entry when full.
+
+        Args:
+            key (bytes): The cache key produced by `_cache_key`.
+            result (Dict[str, Any]): The result dictionary to cache (a copy is stored).
+        """
+        with self._cache_lock:
+            self._cache[key] = dict(result, extracted_info=dict(result['extracted_info']))
+            self._cache.move_to_end(key)
+            if len(self._cache) > self._cache_max:
+                self._cache.popitem(last=False)
+
+    def classify_document(self, text: Union[str, List[str]]) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        The primary method to classify a given document text.
+
+        This method attempts LLM-based classification first. If the LLM is unavailable,
+        unresponsive, or provides an invalid response, it falls back to rule-based classification.
+        After classification, it extracts key information based on the identified document type.
+        A list of texts is delegated to `classify_documents`, which batches the LLM requests.
+
+        Args:
+            text (Union[str, List[str]]): The document text to be classified, or a list of texts.
+
+        Returns:
+            Union[Dict[str, Any], List[Dict[str, Any]]]: A comprehensive dictionary detailing the
+                            classification result, including success status, agent name, timestamp,
+                            document type, confidence, method used, reasoning, extracted information,
+                            and any error messages. A list of such dictionaries for list input.
+        """
+        if isinstance(text, list):
+            return self.classify_documents(text)
+        return self._classify_text(text, datetime.now().isoformat())
+
+    def _classify_text(self, text: str, timestamp: str) -> Dict[str, Any]:
+        """
+        Classifies a single document text; the implementation behind `classify_document`.
+
+        Args:
+            text (str): The document text to be classified.
+            timestamp (str): ISO timestamp recorded in the result.
+
+        Returns:
+            Dict[str, Any]: The result dictionary described in `classify_document`.
+        """
+        result = self._new_result(timestamp)
+
         try:
             logger.info("Starting document classification.")
 
@@ -284,6 +697,12 @@ class ClassifierAgent:
                 result['error_message'] = "Empty or invalid text provided for classification."
                 return result
 
+            cache_key = self._cache_key(text)
+            cached = self._get_cached_result(cache_key, timestamp)
+            if cached is not None:
+                logger.info("Using cached classification result.")
+                return cached
+
             llm_result = None
             # Attempt LLM classification if the utility is available and Ollama is connected.
             if self.llm_utils_available and self.check_ollama_connection():
@@ -302,27 +721,98 @@ class ClassifierAgent:
             else:
                 # Fallback to rule-based classification.
                 logger.info("LLM classification failed or unavailable. Falling back to rule-based classification.")
-                rule_result = self.classify_with_rules(text)
-                result.update({
-                    'success': True,
-                    'document_type': rule_result['document_type'],
-                    'confidence': rule_result['confidence'],
-                    'method_used': 'Rule-based',
-                    'reasoning': rule_result['reasoning']
-                })
+                result.update(self._classify_with_rules_fallback(text), success=True)
                 logger.info("Using rule-based classification result.")
 
-            # Extract key information regardless of the classification method used.
-            extracted_info = self.extract_key_information(text, result['document_type'])
-            result['extracted_info'] = extracted_info
+            # Extract key information regardless of the classification method used,
+            # skipping the call entirely for types that have no extractor.
+            if result['document_type'] in self._extractors:
+                result['extracted_info'] = self.extract_key_information(text, result['document_type'])
 
-            logger.info(f"Document classification completed: {result['document_type']} (confidence: {result['confidence']:.2f}).")
+            # Only LLM results are worth caching: the rule-based fallback is cheap, and caching
+            # it would keep serving it after the LLM becomes reachable again.
+            if result['method_used'] == 'LLM':
+                self._store_cached_result(cache_key, result)
+
+            logger.info("Document classification completed: %s (confidence: %s).", result['document_type'], result['confidence'])
             return result
         except Exception as e:
-            logger.error(f"An unexpected error occurred during document classification: {str(e)}.")
+            logger.error("An unexpected error occurred during document classification: %s.", e)
             result['error_message'] = str(e)
             return result
 
+    def classify_documents(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Classifies a list of documents, batching the LLM requests via `classify_batch`.
+
+        Args:
+            texts (List[str]): The document texts to be classified.
+
+        Returns:
+            List[Dict[str, Any]]: One result dictionary per input text, in input order, with the
+                                  same structure as returned by `classify_document`.
+        """
+        timestamp = datetime.now().isoformat()
+        results = [self._new_result(timestamp) for _ in texts]
+        valid_indices = []
+        for i, text in enumerate(texts):
+            if text and text.strip():
+                valid_indices.append(i)
+            else:
+                results[i]['error_message'] = "Empty or invalid text provided for classification."
+
+        if not valid_indices:
+            return results
+
+        logger.info("Starting batch classification of %d documents.", len(valid_indices))
+        use_llm = self.llm_utils_available and self.check_ollama_connection()
+
+        classifications = self.classify_batch([texts[i] for i in valid_indices], use_llm=use_llm)
+
+        for i, classification in zip(valid_indices, classifications):
+            try:
+                results[i].update({
+                    'success': True,
+                    'document_type': classification['document_type'],
+                    'confidence': classification['confidence'],
+                    'method_used': classification['method_used'],
+                    'reasoning': classification.get('reasoning', 'LLM-based classification')
+                })
+                if results[i]['document_type'] in self._extractors:
+                    results[i]['extracted_info'] = self.extract_key_information(texts[i], results[i]['document_type'])
+            except Exception as e:
+                logger.error("An unexpected error occurred during batch classification: %s.", e)
+                results[i]['error_message'] = str(e)
+
+        return results
+
+    def classify_many(self, texts: List[str], max_workers: int = 8) -> List[Dict[str, Any]]:
+        """
+        Classifies documents one by one, with up to `max_workers` Ollama requests in flight.
+
+        Unlike `classify_documents`, every document gets its own prompt; the requests are
+        issued concurrently from a thread pool and reuse the pooled keep-alive connections
+        of `self.session`, so the round trips overlap instead of running back to back.
+
+        Args:
+            texts (List[str]): The document texts to be classified.
+            max_workers (int): Maximum number of concurrent classifications.
+
+        Returns:
+            List[Dict[str, Any]]: One result dictionary per input text, in input order, with the
+                                  same structure as returned by `classify_document`.
+        """
+        if not texts:
+            return []
+
+        # Probe once up front so the workers all hit the cached health check.
+        self.check_ollama_connection()
+
+        timestamp = datetime.now().isoformat()
+        workers = max(1, min(max_workers, len(texts)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda text: self._classify_text(text, timestamp), texts))
+
 if __name__ == "__main__":
     # Configure basic logging for console output during standalone execution.
     logging.basicConfig(
@@ -1,43 +1,300 @@
-import json
 import logging
 import re
-from typing import Dict, Any, Optional
+import time
+import hashlib
+import statistics
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
 
 import sys
 import os
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Make the project root importable when this file is run directly; skip the append when
+# the root is already on the path (e.g. when imported from main.py).
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _PROJECT_ROOT not in sys.path:
+    sys.path.append(_PROJECT_ROOT)
 
 logger = logging.getLogger(__name__)
 
 _llm_utils_available = False
+call_ollama_llm = None
 try:
-    from utils.llm_utils import call_ollama_llm
+    from utils.llm_utils import OLLAMA_HEADERS, call_ollama_llm, is_timeout_error, new_ollama_adapter
     _llm_utils_available = True
     logger.info("LLM utility 'call_ollama_llm' found and imported for EmailAgent.")
 except ImportError:
     logger.warning("LLM utility 'call_ollama_llm' not found. LLM-based email classification will be unavailable.")
 
+from utils.semantic_cache import SemanticCache
+from utils import json_utils
+
+_ahocorasick_available = False
+try:
+    import ahocorasick
+    _ahocorasick_available = True
+except ImportError:
+    logger.info("pyahocorasick not installed; rule-based email classification will scan keywords one at a time.")
+
+# Rule tables for the rule-based fallback, in priority order: the first category with a
+# keyword present in the email wins. Keywords are matched as lowercase substrings.
+_INTENT_RULES = [
+    ("Quote Request", ["quote", "quotation", "estimate", "pricing"]),
+    ("Order", ["order", "purchase", "procure", "buy"]),
+    ("Support", ["support", "help", "issue", "problem", "bug", "trouble"]),
+    ("Feedback", ["feedback", "suggestion", "review", "complaint"]),
+]
+# More specific keywords are used for higher urgency levels.
+_URGENCY_RULES = [
+    ("High", ["urgent", "asap", "immediately", "critical", "down", "halted"]),
+    ("Critical", ["blocker", "outage"]),
+]
+
+def _build_rule_automaton(rules):
+    """
+    Builds an Aho-Corasick automaton mapping every keyword of a rule table to
+    (priority, category), so one pass over the text finds all rule hits.
+    """
+    automaton = ahocorasick.Automaton()
+    for priority, (category, keywords) in enumerate(rules):
+        for keyword in keywords:
+            automaton.add_word(keyword, (priority, category))
+    automaton.make_automaton()
+    return automaton
+
+def _build_rule_patterns(rules):
+    """
+    Compiles one case-insensitive alternation per category of a rule table. Used when
+    pyahocorasick is unavailable; matching the original text avoids a lowercased copy.
+    """
+    return [(re.compile('|'.join(map(re.escape, keywords)), re.IGNORECASE), category)
+            for category, keywords in rules]
+
+_INTENT_AC = _build_rule_automaton(_INTENT_RULES) if _ahocorasick_available else None
+_URGENCY_AC = _build_rule_automaton(_URGENCY_RULES) if _ahocorasick_available else None
+_INTENT_PATTERNS = _build_rule_patterns(_INTENT_RULES)
+_URGENCY_PATTERNS = _build_rule_patterns(_URGENCY_RULES)
+
+def _match_automaton(text_lower: str, automaton, default: str) -> Tuple[str, int]:
+    """
+    Returns the highest-priority category found by a rule automaton in lowercased text
+    together with its number of keyword hits, or (`default`, 0) if no keyword occurs.
+    """
+    best_priority, best_category, hits = None, default, 0
+    for _, (priority, category) in automaton.iter(text_lower):
+        if best_priority is None or priority < best_priority:
+            best_priority, best_category, hits = priority, category, 1
+        elif priority == best_priority:
+            hits += 1
+    return best_category, hits
+
+def _match_patterns(text: str, patterns, default: str) -> Tuple[str, int]:
+    """
+    Returns the category of the first rule pattern found in the text together with its
+    number of keyword hits, or (`default`, 0) if no pattern matches.
+    """
+    for pattern, category in patterns:
+        if pattern.search(text):
+            return category, len(pattern.findall(text))
+    return default, 0
+
+# Static part of the LLM prompt, kept at column 0 so no indentation leaks into the prompt
+# tokens. The email text is placed between prefix and suffix.
+_PROMPT_PREFIX = """Classify the intent and urgency of the following email.
+Possible intents: 'Quote Request', 'Order', 'General Inquiry', 'Support', 'Feedback', 'Other'.
+Possible urgencies: 'Low', 'Normal', 'High', 'Critical'.
+
+Provide your response as a strict JSON object with 'intent' and 'urgency' keys.
+Example Valid JSON Response:
+{"intent": "Quote Request", "urgency": "High"}
+
+Email:
+---
+"""
+_PROMPT_SUFFIX = "\n---\n"
+
+_INTENT_CHOICES = ('Quote Request', 'Order', 'General Inquiry', 'Support', 'Feedback', 'Other')
+_URGENCY_CHOICES = ('Low', 'Normal', 'High', 'Critical')
+# Hashed membership for validating LLM output.
+_ALLOWED_INTENTS = frozenset(_INTENT_CHOICES)
+_ALLOWED_URGENCIES = frozenset(_URGENCY_CHOICES)
+
+# JSON schema passed as Ollama's `format`, constraining decoding to exactly the expected object.
+_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "intent": {"type": "string", "enum": list(_INTENT_CHOICES)},
+        "urgency": {"type": "string", "enum": list(_URGENCY_CHOICES)}
+    },
+    "required": ["intent", "urgency"]
+}
+
+class EmailFeatures(NamedTuple):
+    """
+    Per-email values derived once in `process_email` and shared by the LLM cache
+    lookup and the rule-based classification, so the text is lowercased only once.
+    """
+    text: str
+    text_lower: str
+
+# Email text extraction dispatched on the exact input type.
+_EMAIL_TEXT_EXTRACTORS = {
+    str: lambda email_input: email_input,
+    dict: lambda email_input: email_input.get('body') or email_input.get('text') or "",
+}
+
+def _extract_email_text(email_input: Any) -> Optional[str]:
+    """
+    Returns the textual content of an email given as a string or a dictionary
+    (its 'body', else its 'text'), or None for unsupported input types.
+    """
+    extractor = _EMAIL_TEXT_EXTRACTORS.get(type(email_input))
+    if extractor is None:
+        # Subclasses (e.g. OrderedDict) miss the exact-type lookup; resolve them by isinstance.
+        extractor = next((func for base, func in _EMAIL_TEXT_EXTRACTORS.items() if isinstance(email_input, base)), None)
+        if extractor is None:
+            return None
+    return extractor(email_input)
+
 class EmailAgent:
     """
     The EmailAgent class is designed to classify the intent and urgency of incoming emails.
     It employs a sophisticated hybrid approach, prioritizing classification via a Large Language Model (LLM)
     and falling back to a rule-based system if the LLM is unavailable or fails to provide a valid response.
     """
-    def __init__(self, ollama_url: str = "http://localhost:11434"):
+    # Fixed attribute layout: no per-instance __dict__. '__weakref__' keeps instances weak-referenceable.
+    __slots__ = (
+        'agent_name', 'ollama_url', 'llm_model', 'llm_utils_available',
+        '_llm_cache', '_llm_cache_max', '_llm_cache_lock', 'semantic_cache', 'concurrency',
+        'session', 'request_timeout', 'llm_options', 'llm_keep_alive',
+        'high_confidence_short_circuit', 'fast_path_confidence',
+        '_stats_lock', '_llm_latencies_ns', '_cache_hits', '_cache_misses', '_llm_errors', '__weakref__'
+    )
+
+    # Bound once at class creation, so the hot path resolves the LLM call as a class attribute.
+    _call_llm = staticmethod(call_ollama_llm) if call_ollama_llm is not None else None
+
+    def __init__(self, ollama_url: str = "http://localhost:11434", llm_model: Optional[str] = None,
+                 semantic_cache: Optional[SemanticCache] = None):
         """
         Initializes the EmailAgent with configuration for LLM interaction.
 
         Args:
             ollama_url (str): The base URL for the Ollama server, which hosts the LLM.
                               This URL is used by the `llm_utils` module to communicate with the LLM.
+            llm_model (Optional[str]): The Ollama model used for classification. Defaults to the
+                              EMAIL_AGENT_MODEL environment variable, or `llama3.2:1b`: a small
+                              model is sufficient for picking from two short enums.
+            semantic_cache (Optional[SemanticCache]): Similarity cache consulted after an exact-cache
+                              miss, so near-duplicate emails reuse an earlier LLM classification.
+                              Off by default: bag-of-words similarity cannot tell "urgent" from
+                              "not urgent", so only pass one when near-duplicates are known to
+                              share their labels.
         """
         self.agent_name = "Email_Agent"
         self.ollama_url = ollama_url
-        self.llm_model = "mistral:latest"
+        self.llm_model = llm_model or os.getenv("EMAIL_AGENT_MODEL", "llama3.2:1b")
         self.llm_utils_available = _llm_utils_available
 
-    def _rule_based_email_intent(self, email_text: str) -> Dict[str, str]:
+        # Bounded LRU of validated LLM classifications, keyed by a digest of the model name and
+        # the normalized email text. Guarded by a lock so the agent can be shared across threads.
+        self._llm_cache: "OrderedDict[bytes, Tuple[str, str]]" = OrderedDict()
+        self._llm_cache_max = 1024
+        self._llm_cache_lock = threading.Lock()
+
+        # Rolling LLM call latencies and cache/error counters reported by `get_stats`.
+        self._stats_lock = threading.Lock()
+        self._llm_latencies_ns: deque = deque(maxlen=1024)
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._llm_errors = 0
+
+        # Optional similarity cache for near-duplicate emails (re-sent tickets); None disables it.
+        self.semantic_cache = semantic_cache
+
+        # Number of emails classified in parallel by `process_emails`; Ollama serves concurrent
+        # generations up to its OLLAMA_NUM_PARALLEL slots.
+        self.concurrency = max(1, int(os.getenv("EMAIL_AGENT_CONCURRENCY", "8")))
+
+        # Long-lived keep-alive session for all LLM calls, so consecutive classifications reuse
+        # pooled connections instead of reconnecting. Sized for `process_emails` concurrency.
+        # The llm_utils adapter retries transient failures (connection resets, 502/503/504) and
+        # honours OLLAMA_SOCKET; read timeouts are left to `_call_llm_with_retry`.
+        self.session = requests.Session()
+        if _llm_utils_available:
+            adapter = new_ollama_adapter(pool_connections=16, pool_maxsize=32, retry_read_timeouts=False)
+        else:
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(OLLAMA_HEADERS if _llm_utils_available else {'Connection': 'keep-alive'})
+
+        # Timeout in seconds for each wait on the server (connecting, or the gap before the next
+        # streamed chunk), not a bound on the whole call. A timed-out call is retried once
+        # before falling back to rule-based classification.
+        self.request_timeout = float(os.getenv("EMAIL_AGENT_LLM_TIMEOUT", "15"))
+
+        # Generation options. Reuse of the shared instruction prefix between requests comes from
+        # Ollama's own prompt cache, which `keep_alive` keeps loaded along with the model.
+        # `num_keep` does not affect latency: it only keeps the instructions (~80 tokens) when a
+        # long email overflows the context and is truncated. The answer is a tiny JSON object.
+        self.llm_options = {"num_keep": 80, "num_predict": 32, "temperature": 0, "top_p": 1.0}
+        self.llm_keep_alive = "10m"
+
+        # When True, emails the rules classify with high confidence (specific intent and urgency)
+        # skip the LLM entirely. Off by default: the rules match plain substrings, so negations
+        # ("not urgent") and words containing a keyword ("download") are scored as hits.
+        self.high_confidence_short_circuit = False
+        self.fast_path_confidence = 0.8
+
+    def close(self):
+        """
+        Closes the pooled HTTP connections held by the agent.
+        """
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _llm_cache_key(self, features: EmailFeatures) -> bytes:
+        """
+        Builds the LLM cache key for an email: a 16-byte BLAKE2b digest of the model name
+        and the stripped, lowercased email text.
+        """
+        normalized = f"{self.llm_model}\0{features.text_lower.strip()}"
+        return hashlib.blake2b(normalized.encode('utf-8', 'ignore'), digest_size=16).digest()
+
+    def _get_cached_llm_classification(self, key: bytes) -> Optional[Dict[str, str]]:
+        """
+        Returns the cached LLM classification for a cache key, or None on a miss.
+        A hit marks the entry as most recently used.
+        """
+        with self._llm_cache_lock:
+            cached = self._llm_cache.get(key)
+            if cached is None:
+                return None
+            self._llm_cache.move_to_end(key)
+        return {"intent": cached[0], "urgency": cached[1]}
+
+    def _store_llm_classification(self, key: bytes, classification: Dict[str, str]):
+        """
+        Caches a validated LLM classification, evicting the least recently used entry when full.
+        """
+        with self._llm_cache_lock:
+            self._llm_cache[key] = (classification['intent'], classification['urgency'])
+            self._llm_cache.move_to_end(key)
+            if len(self._llm_cache) > self._llm_cache_max:
+                self._llm_cache.popitem(last=False)
+
+    def _rule_based_email_intent(self, email_text: str, features: Optional[EmailFeatures] = None) -> Dict[str, Any]:
         """
         Applies a set of predefined rules to determine the intent and urgency of an email.
         This method serves as a resilient fallback mechanism when LLM classification is not feasible
@@ -45,36 +302,63 @@ class EmailAgent:
 
         Args:
             email_text (str): The full text content of the email to be classified.
+            features (Optional[EmailFeatures]): Precomputed features of the same email; its
+                              lowercased text is reused instead of lowercasing again.
+
+        Returns:
+            Dict[str, Any]: A dictionary containing the classified 'intent' and 'urgency' as strings,
+                            plus a 'confidence' derived from the keyword hits.
+                            Example: {"intent": "Support", "urgency": "High", "confidence": 0.9}
+        """
+        # Apply the ordered rule tables; with pyahocorasick each table is a single pass over the text.
+        if _INTENT_AC is not None:
+            email_text_lower = features.text_lower if features is not None else email_text.lower()
+            intent, intent_hits = _match_automaton(email_text_lower, _INTENT_AC, "General Inquiry")
+            urgency, urgency_hits = _match_automaton(email_text_lower, _URGENCY_AC, "Normal")
+        else:
+            # The case-insensitive patterns run on the original text, without a lowercased copy.
+            intent, intent_hits = _match_patterns(email_text, _INTENT_PATTERNS, "General Inquiry")
+            urgency, urgency_hits = _match_patterns(email_text, _URGENCY_PATTERNS, "Normal")
+
+        # Confidence: several intent keywords, or one backed by an explicit urgency keyword,
+        # make the label unambiguous; a single intent keyword alone is only a hint.
+        if not intent_hits:
+            confidence = 0.3
+        elif intent_hits >= 2 or urgency_hits:
+            confidence = 0.9
+        else:
+            confidence = 0.6
+
+        logger.info("Rule-based email classification: Intent='%s', Urgency='%s' (confidence: %.2f)", intent, urgency, confidence)
+        return {"intent": intent, "urgency": urgency, "confidence": confidence}
+
+    def _call_llm_with_retry(self, prompt: str) -> Optional[str]:
+        """
+        Calls the LLM with `self.request_timeout` as its per-read timeout, retrying once if the
+        call times out (including a read timeout in the middle of the streamed response).
+
+        Args:
+            prompt (str): The prompt to send to the LLM.
 
         Returns:
-            Dict[str, str]: A dictionary containing the classified 'intent' and 'urgency' as strings.
-                            Example: {"intent": "Support", "urgency": "High"}
+            Optional[str]: The raw LLM response text.
+
+        Raises:
+            requests.exceptions.RequestException: If the retry times out as well (a Timeout, or
+                a ConnectionError for a timeout mid-stream).
         """
-        email_text_lower = email_text.lower()
-
-        intent = "General Inquiry"
-        urgency = "Normal"
-
-        # Define and apply rules for email intent classification.
-        # These rules are ordered and can be expanded for more granular classification.
-        if any(keyword in email_text_lower for keyword in ["quote", "quotation", "estimate", "pricing"]):
-            intent = "Quote Request"
-        elif any(keyword in email_text_lower for keyword in ["order", "purchase", "procure", "buy"]):
-            intent = "Order"
-        elif any(keyword in email_text_lower for keyword in ["support", "help", "issue", "problem", "bug", "trouble"]):
-            intent = "Support"
-        elif any(keyword in email_text_lower for keyword in ["feedback", "suggestion", "review", "complaint"]):
-            intent = "Feedback"
-
-        # Define and apply rules for email urgency classification.
-        # More specific keywords are used for higher urgency levels.
-        if any(keyword in email_text_lower for keyword in ["urgent", "asap", "immediately", "critical", "down", "halted"]):
-            urgency = "High"
-        elif any(keyword in email_text_lower for keyword in ["blocker", "outage"]):
-            urgency = "Critical"
-
-        logger.info(f"Rule-based email classification: Intent='{intent}', Urgency='{urgency}'")
-        return {"intent": intent, "urgency": urgency}
+        # Stream the answer and stop reading once the JSON object is closed, so trailing
+        # tokens the model might still generate are never waited for.
+        kwargs = dict(model=self.llm_model, timeout=self.request_timeout, session=self.session,
+                      options=self.llm_options, format=_RESPONSE_SCHEMA, keep_alive=self.llm_keep_alive,
+                      stream=True, stop_after_json=True)
+        try:
+            return self._call_llm(prompt, **kwargs)
+        except requests.exceptions.RequestException as e:
+            if not is_timeout_error(e):
+                raise
+            logger.warning("LLM call timed out after %s seconds. Retrying once.", self.request_timeout)
+            return self._call_llm(prompt, **kwargs)
 
     def _classify_email_intent_with_llm(self, email_text: str) -> Dict[str, str]:
         """
@@ -98,64 +382,110 @@ class EmailAgent:
             logger.error("LLM utility not available. Cannot perform LLM classification.")
             raise RuntimeError("LLM utility not available.")
 
-        # Construct the prompt for the LLM, specifying desired output format and categories.
-        prompt = f"""
-        Classify the intent and urgency of the following email.
-        Possible intents: 'Quote Request', 'Order', 'General Inquiry', 'Support', 'Feedback', 'Other'.
-        Possible urgencies: 'Low', 'Normal', 'High', 'Critical'.
-
-        Provide your response as a strict JSON object with 'intent' and 'urgency' keys.
-        Example Valid JSON Response:
-        {{"intent": "Quote Request", "urgency": "High"}}
-
-        Email:
-        ---
-        {email_text}
-        ---
-        """
+        # Construct the prompt for the LLM: the static instructions followed by the email.
+        prompt = _PROMPT_PREFIX + email_text + _PROMPT_SUFFIX
 
         logger.info("Attempting LLM classification for email intent.")
         llm_raw_response = None
         try:
-            # Call the LLM with the prepared prompt and model.
-            llm_raw_response = call_ollama_llm(prompt, model=self.llm_model)
-            logger.debug(f"Raw LLM response for email: {llm_raw_response[:200]}...")
+            # Call the LLM with the prepared prompt and model, bounded by the request timeout.
+            # The start time is local to this call so concurrent calls never share it.
+            started_ns = time.perf_counter_ns()
+            try:
+                llm_raw_response = self._call_llm_with_retry(prompt)
+            finally:
+                elapsed_ns = time.perf_counter_ns() - started_ns
+                with self._stats_lock:
+                    self._llm_latencies_ns.append(elapsed_ns)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Raw LLM response for email: %s...", llm_raw_response[:200])
 
             # Parse the LLM's raw response as a JSON object.
-            result = json.loads(llm_raw_response)
+            result = json_utils.loads(llm_raw_response)
 
             # Validate that the essential 'intent' and 'urgency' keys are present and are strings.
             if "intent" in result and "urgency" in result and \
                isinstance(result['intent'], str) and isinstance(result['urgency'], str):
 
-                # Further validate that the LLM's output matches allowed categories.
-                allowed_intents = ['Quote Request', 'Order', 'General Inquiry', 'Support', 'Feedback', 'Other']
-                allowed_urgencies = ['Low', 'Normal', 'High', 'Critical']
-
+                # Further validate that the LLM's output matches allowed categories. The schema
+                # already enforces this; the check guards against servers that ignore `format`.
                 # Default to 'Other' or 'Normal' if the LLM generates an unrecognized category.
-                if result['intent'] not in allowed_intents:
-                    logger.warning(f"LLM returned unknown intent: '{result['intent']}'. Mapping to 'Other'.")
+                if result['intent'] not in _ALLOWED_INTENTS:
+                    logger.warning("LLM returned unknown intent: '%s'. Mapping to 'Other'.", result['intent'])
                     result['intent'] = 'Other'
-                if result['urgency'] not in allowed_urgencies:
-                    logger.warning(f"LLM returned unknown urgency: '{result['urgency']}'. Mapping to 'Normal'.")
+                if result['urgency'] not in _ALLOWED_URGENCIES:
+                    logger.warning("LLM returned unknown urgency: '%s'. Mapping to 'Normal'.", result['urgency'])
                     result['urgency'] = 'Normal'
 
-                logger.info(f"LLM email classification successful: Intent='{result['intent']}', Urgency='{result['urgency']}'")
+                logger.info("LLM email classification successful: Intent='%s', Urgency='%s'", result['intent'], result['urgency'])
                 return result
             else:
                 # Log a warning and raise an error if the LLM's JSON structure is incorrect.
-                logger.warning(f"LLM response for email missing 'intent'/'urgency' keys or invalid type. Raw: {llm_raw_response}")
+                logger.warning("LLM response for email missing 'intent'/'urgency' keys or invalid type. Raw: %s", llm_raw_response)
                 raise ValueError("LLM response format invalid for email intent.")
 
-        except json.JSONDecodeError as e:
+        except json_utils.JSONDecodeError as e:
             # Handle cases where the LLM's response is not valid JSON.
-            logger.error(f"Failed to parse LLM response for email as JSON: '{llm_raw_response}'. Error: {e}")
+            logger.error("Failed to parse LLM response for email as JSON: '%s'. Error: %s", llm_raw_response, e)
             raise
         except Exception as e:
             # Catch any other unforeseen errors during the LLM process.
-            logger.error(f"Error during LLM email intent classification: {e}")
+            logger.error("Error during LLM email intent classification: %s", e)
             raise
 
+    def _count_cache_lookup(self, hit: bool):
+        """
+        Counts an LLM cache lookup (exact or near-duplicate) as a hit or a miss.
+        """
+        with self._stats_lock:
+            if hit:
+                self._cache_hits += 1
+            else:
+                self._cache_misses += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Reports LLM latency percentiles and cache/error rates, e.g. to tune `request_timeout`
+        or the cache sizes.
+
+        Returns:
+            Dict[str, Any]: 'llm_calls' (latencies recorded, last 1024 at most), 'p50_ms', 'p95_ms'
+                            and 'p99_ms' (None without data), 'cache_hit_rate' over all LLM cache
+                            lookups, and 'llm_error_rate' over all LLM classification attempts.
+        """
+        with self._stats_lock:
+            latencies_ms = [ns / 1e6 for ns in self._llm_latencies_ns]
+            hits, misses, errors = self._cache_hits, self._cache_misses, self._llm_errors
+
+        p50 = p95 = p99 = None
+        if len(latencies_ms) == 1:
+            p50 = p95 = p99 = latencies_ms[0]
+        elif latencies_ms:
+            cuts = statistics.quantiles(latencies_ms, n=100, method='inclusive')
+            p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+
+        lookups = hits + misses
+        return {
+            'llm_calls': len(latencies_ms),
+            'p50_ms': p50,
+            'p95_ms': p95,
+            'p99_ms': p99,
+            'cache_hit_rate': hits / lookups if lookups else 0.0,
+            'llm_error_rate': errors / misses if misses else 0.0
+        }
+
+    @staticmethod
+    def _apply_classification(result: Dict[str, Any], classification: Dict[str, Any], method: str):
+        """
+        Records a successful classification (intent and urgency) and the method used in a result.
+        """
+        result.update({
+            'success': True,
+            'intent': classification['intent'],
+            'urgency': classification['urgency'],
+            'method_used': method
+        })
+
     def process_email(self, email_input: Any) -> Dict[str, Any]:
         """
         The main public method for classifying email intent and urgency.
@@ -173,7 +503,8 @@ class EmailAgent:
                             - 'agent' (str): The name of the agent.
                             - 'intent' (str): The classified intent of the email (e.g., 'Support', 'Order').
                             - 'urgency' (str): The classified urgency of the email (e.g., 'High', 'Normal').
-                            - 'method_used' (str): Indicates whether 'LLM' or 'Rule-based' method was used.
+                            - 'method_used' (str): Indicates whether 'LLM', 'Rule-based' or
+                              'Rule-based-fast-path' (LLM skipped for an unambiguous match) was used.
                             - 'error_message' (Optional[str]): A description of any error that occurred.
         """
         result = {
@@ -186,12 +517,8 @@ class EmailAgent:
         }
 
         # Extract the textual content of the email from various input formats.
-        email_text = ""
-        if isinstance(email_input, dict):
-            email_text = email_input.get('body') or email_input.get('text') or ""
-        elif isinstance(email_input, str):
-            email_text = email_input
-        else:
+        email_text = _extract_email_text(email_input)
+        if email_text is None:
             result['error_message'] = f"Invalid email input type: {type(email_input)}. Expected str or dict."
             logger.error(result['error_message'])
             return result
@@ -201,38 +528,96 @@ class EmailAgent:
             logger.warning(result['error_message'])
             return result
 
+        # Lowercase once; the cache key and the keyword rules both work on the lowercased text.
+        features = EmailFeatures(email_text, email_text.lower())
+
+        rule_classification_output = None
+        if self.high_confidence_short_circuit:
+            # Rules cost microseconds; only ambiguous emails are worth an LLM round trip.
+            rule_classification_output = self._rule_based_email_intent(email_text, features)
+            if (rule_classification_output['confidence'] >= self.fast_path_confidence
+                    and rule_classification_output['intent'] != 'General Inquiry'
+                    and rule_classification_output['urgency'] != 'Normal'):
+                self._apply_classification(result, rule_classification_output, 'Rule-based-fast-path')
+                logger.info("Rule-based classification is unambiguous; skipping the LLM.")
+                return result
+
         llm_classification_success = False
         # Attempt LLM classification if the LLM utility is available.
         if self.llm_utils_available:
             try:
-                llm_classification_output = self._classify_email_intent_with_llm(email_text)
-                result.update({
-                    'success': True,
-                    'intent': llm_classification_output['intent'],
-                    'urgency': llm_classification_output['urgency'],
-                    'method_used': 'LLM'
-                })
+                cache_key = self._llm_cache_key(features)
+                llm_classification_output = self._get_cached_llm_classification(cache_key)
+                if llm_classification_output is not None:
+                    logger.info("Using cached LLM classification for email.")
+                    self._count_cache_lookup(hit=True)
+                else:
+                    if self.semantic_cache is not None:
+                        llm_classification_output = self.semantic_cache.lookup(email_text)
+                    if llm_classification_output is not None:
+                        logger.info("Using LLM classification of a near-duplicate email.")
+                        self._count_cache_lookup(hit=True)
+                    else:
+                        self._count_cache_lookup(hit=False)
+                        llm_classification_output = self._classify_email_intent_with_llm(email_text)
+                        # Only validated results reach this point; failures raise and are never cached.
+                        if self.semantic_cache is not None:
+                            self.semantic_cache.insert(email_text, llm_classification_output)
+                    self._store_llm_classification(cache_key, llm_classification_output)
+                self._apply_classification(result, llm_classification_output, 'LLM')
                 logger.info("Using LLM for email classification.")
                 llm_classification_success = True
             except Exception as e:
                 # Log any failure from the LLM and proceed to rule-based fallback.
-                logger.warning(f"LLM email classification failed ({e}). Falling back to rule-based.")
+                with self._stats_lock:
+                    self._llm_errors += 1
+                logger.warning("LLM email classification failed (%s). Falling back to rule-based.", e)
         else:
             logger.info("LLM utility not available. Directly performing rule-based email classification.")
 
         # If LLM classification was not successful (either failed or not available), use rule-based.
         if not llm_classification_success:
-            rule_classification_output = self._rule_based_email_intent(email_text)
-            result.update({
-                'success': True,
-                'intent': rule_classification_output['intent'],
-                'urgency': rule_classification_output['urgency'],
-                'method_used': 'Rule-based'
-            })
+            if rule_classification_output is None:
+                rule_classification_output = self._rule_based_email_intent(email_text, features)
+            self._apply_classification(result, rule_classification_output, 'Rule-based')
             logger.info("Using rule-based for email classification.")
         
         return result
 
+    def process_emails(self, emails: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Classifies several emails, running the LLM requests concurrently.
+
+        Emails are dispatched to a thread pool of `self.concurrency` workers (configurable via
+        the EMAIL_AGENT_CONCURRENCY environment variable), so the Ollama round trips overlap
+        instead of running back to back. Inputs without any text are answered directly,
+        without being scheduled.
+
+        Args:
+            emails (List[Any]): Email inputs, each a string or a dictionary as accepted by `process_email`.
+
+        Returns:
+            List[Dict[str, Any]]: One result dictionary per input, in input order, with the
+                                  same structure as returned by `process_email`.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(emails)
+        pending = []
+        for i, email_input in enumerate(emails):
+            email_text = _extract_email_text(email_input)
+            if isinstance(email_text, str) and email_text.strip():
+                pending.append(i)
+            else:
+                # Invalid or empty input: process_email returns the error result immediately.
+                results[i] = self.process_email(email_input)
+
+        if pending:
+            workers = min(self.concurrency, len(pending))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for i, result in zip(pending, executor.map(self.process_email, [emails[i] for i in pending])):
+                    results[i] = result
+
+        return results
+
 if __name__ == "__main__":
     # Configure basic logging for console output when the script is run directly.
     logging.basicConfig(
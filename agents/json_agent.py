@@ -1,11 +1,162 @@
 import logging
 import json
 import os
-from typing import Dict, Any, List
-from datetime import datetime
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Callable, Optional
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _PROJECT_ROOT not in sys.path:
+    sys.path.append(_PROJECT_ROOT)
+
+from utils import json_utils
 
 logger = logging.getLogger(__name__)
 
+# Optional: fastjsonschema generates a straight-line Python validator from a JSON Schema,
+# which lets well-formed records skip the field-by-field checks below.
+_fastjsonschema_available = False
+try:
+    import fastjsonschema
+    _fastjsonschema_available = True
+except ImportError:
+    logger.info("fastjsonschema not installed; JSON records are validated with the built-in checks only.")
+
+# Optional: ijson parses incrementally, so oversized files can be scanned for the schema
+# fields without materializing the whole document.
+_ijson_available = False
+try:
+    import ijson
+    _ijson_available = True
+except ImportError:
+    logger.info("ijson not installed; oversized JSON files will be parsed in full.")
+
+# Compiled validators keyed by the canonical serialization of their schema, so each
+# schema is compiled once per process no matter how many agents or calls use it.
+_COMPILED_VALIDATORS: Dict[str, Callable[[Any], Any]] = {}
+
+# Validation messages, hoisted so each call only fills in the offending value (if any).
+_CUSTOMER_NOT_DICT_MSG = "JSONAgent: 'customer' field is not a dictionary. Type: %s"
+_CUSTOMER_KEYS_MISSING_MSG = "JSONAgent: 'customer' dictionary is missing 'name' or 'email'."
+_AMOUNT_INVALID_MSG = "JSONAgent: 'amount' field '%s' is not a valid number."
+_ID_INVALID_MSG = "JSONAgent: 'id' field '%s' is not a valid string or integer."
+
+# Sentinel distinguishing an absent field from one explicitly set to null.
+_MISSING = object()
+
+
+def _validate_record(record: Dict[str, Any], validation_errors: List[str]) -> None:
+    """
+    Runs the per-field checks on a reformatted record, normalizing 'amount' to a float.
+
+    Kept as a plain module-level function over locals so the hot path does no attribute
+    lookups on the agent. Each field is read once, validated, and written back only if it
+    changes.
+
+    Args:
+        record (Dict[str, Any]): The reformatted record; every TARGET_SCHEMA key is present.
+        validation_errors (List[str]): List that problems found are appended to (and logged).
+    """
+    # Validate the 'customer' field: ensure it's a dictionary and contains expected nested keys.
+    # JSON objects always parse to plain dicts, so an exact type check is sufficient.
+    customer = record['customer']
+    if customer is not None:
+        if type(customer) is not dict:
+            warning_msg = _CUSTOMER_NOT_DICT_MSG % (type(customer),)
+            logger.warning(warning_msg)
+            validation_errors.append(warning_msg)
+        elif 'name' not in customer or 'email' not in customer:
+            # Essential nested fields are missing from the 'customer' dictionary.
+            logger.warning(_CUSTOMER_KEYS_MISSING_MSG)
+            validation_errors.append(_CUSTOMER_KEYS_MISSING_MSG)
+
+    # Validate the 'amount' field: attempt to convert it to a float. Numbers the parser already
+    # decoded natively skip the generic float() parsing path.
+    amount = record['amount']
+    amount_type = type(amount)
+    if amount_type is float:
+        pass
+    elif amount_type is int:
+        record['amount'] = float(amount)
+    elif amount is not None:
+        try:
+            record['amount'] = float(amount)
+        except (ValueError, TypeError):
+            warning_msg = _AMOUNT_INVALID_MSG % (amount,)
+            logger.warning(warning_msg)
+            validation_errors.append(warning_msg)
+
+    # Validate the 'id' field: ensure it is either a string or an integer.
+    record_id = record['id']
+    if record_id is not None and not isinstance(record_id, (str, int)):
+        warning_msg = _ID_INVALID_MSG % (record_id,)
+        logger.warning(warning_msg)
+        validation_errors.append(warning_msg)
+
+
+def _now_iso() -> str:
+    """
+    Returns the current local time in ISO 8601 format with microseconds.
+
+    Equivalent to datetime.now().isoformat() but formats straight from time.time()
+    without building a datetime object.
+
+    Returns:
+        str: A timestamp such as '2024-06-14T09:30:05.123456'.
+    """
+    now = time.time()
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(now)) + '.%06d' % int((now % 1) * 1_000_000)
+
+
+def _prefetch_files(paths: List[str]) -> None:
+    """
+    Asks the kernel to start reading the given files into the page cache.
+
+    Uses posix_fadvise(POSIX_FADV_WILLNEED), which returns immediately, so disk reads for
+    later files overlap with parsing of earlier ones. A no-op on platforms without it;
+    unreadable paths are skipped and reported when they are actually processed.
+
+    Args:
+        paths (List[str]): Paths of the files that are about to be read.
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+def _get_compiled_validator(schema: Dict[str, Any]) -> Optional[Callable[[Any], Any]]:
+    """
+    Returns a cached fastjsonschema validator for `schema`, compiling it on first use.
+
+    Args:
+        schema (Dict[str, Any]): A JSON Schema document.
+
+    Returns:
+        Optional[Callable[[Any], Any]]: The compiled validator, or None if fastjsonschema
+                                        is not installed.
+    """
+    if not _fastjsonschema_available:
+        return None
+    key = json.dumps(schema, sort_keys=True)
+    validator = _COMPILED_VALIDATORS.get(key)
+    if validator is None:
+        validator = fastjsonschema.compile(schema)
+        _COMPILED_VALIDATORS[key] = validator
+    return validator
+
+
 class JsonAgent:
     """
     The JsonAgent class is designed to process JSON files. Its primary responsibilities include:
@@ -20,14 +171,58 @@ class JsonAgent:
 
     # Defines the expected keys in the JSON data for validation and extraction.
     # This schema can be expanded to include nested fields or enforce specific types.
-    TARGET_SCHEMA = ['id', 'date', 'amount', 'customer', 'items', 'currency']
+    # The names are interned so lookups against parsed keys can match on identity first.
+    TARGET_SCHEMA = [sys.intern(field) for field in ('id', 'date', 'amount', 'customer', 'items', 'currency')]
+    # Immutable views of TARGET_SCHEMA: a tuple for ordered iteration and a frozenset for
+    # O(1) membership tests.
+    TARGET_SCHEMA_ORDER = tuple(TARGET_SCHEMA)
+    TARGET_SCHEMA_SET = frozenset(TARGET_SCHEMA)
+
+    # Fields without which a record cannot be used at all. If any of them is missing the
+    # record is rejected as 'invalid_schema' before the per-field validation runs.
+    REQUIRED_FIELDS = frozenset({'id', 'amount'})
+
+    # Files larger than this are streamed with ijson (when installed) and only the top-level
+    # TARGET_SCHEMA fields are kept, which bounds memory use for e.g. huge 'items' arrays.
+    STREAMING_THRESHOLD_BYTES = 50 * 1024 * 1024
+
+    # JSON Schema describing a record that passes every check in process_json. It is only a
+    # fast pass: anything it rejects is re-checked field by field so the reported validation
+    # errors stay the same. Missing fields are reported separately, so nothing is required here.
+    TARGET_JSON_SCHEMA = {
+        'type': 'object',
+        'properties': {
+            'id': {'type': ['string', 'integer', 'null']},
+            'amount': {'type': ['number', 'null']},
+            'customer': {
+                'anyOf': [
+                    {'type': 'null'},
+                    {'type': 'object', 'required': ['name', 'email']},
+                ]
+            },
+        },
+    }
 
     def __init__(self):
         """
         Initializes the JsonAgent.
         """
         self.agent_name = "JSON_Agent"
-        logger.info(f"{self.agent_name} initialized.")
+        # Static part of every result; process_json copies it and fills in the per-call
+        # fields. Mutable values are left as None here so the template is never shared.
+        self._result_template = {
+            'success': False,
+            'agent': self.agent_name,
+            'timestamp': None,
+            'file_path': None,
+            'processed_data': None,
+            'missing_fields': None,
+            'validation_errors': None,
+            'error_message': None,
+            'status': 'failed'
+        }
+        self._validator = _get_compiled_validator(self.TARGET_JSON_SCHEMA)
+        logger.info("%s initialized.", self.agent_name)
 
     def process_json(self, file_path: str) -> Dict[str, Any]:
         """
@@ -55,75 +250,64 @@ class JsonAgent:
                             - 'error_message' (Optional[str]): A general error description if a critical
                                                                processing failure occurred.
                             - 'status' (str): A descriptive status of the processing outcome
-                                              ('processed', 'file_not_found', 'invalid_json', 'processing_failed').
+                                              ('processed', 'invalid_schema', 'file_not_found', 'invalid_json',
+                                               'processing_failed').
         """
-        result = {
-            'success': False,
-            'agent': self.agent_name,
-            'timestamp': datetime.now().isoformat(),
-            'file_path': file_path,
-            'processed_data': {},
-            'missing_fields': [],
-            'validation_errors': [],
-            'error_message': None,
-            'status': 'failed'
-        }
+        result = self._result_template.copy()
+        result['timestamp'] = _now_iso()
+        result['file_path'] = file_path
+        result['processed_data'] = {}
+        result['missing_fields'] = []
+        result['validation_errors'] = []
 
-        logger.info(f"JSONAgent: Starting processing for file: {file_path}")
+        logger.info("JSONAgent: Starting processing for file: %s", file_path)
 
         try:
-            # Step 1: Verify the existence of the specified JSON file.
-            if not os.path.exists(file_path):
-                raise FileNotFoundError(f"JSON file not found at: {file_path}")
+            # Steps 1 & 2: Read and parse the JSON data from the file. There is no separate
+            # existence check: open() raises FileNotFoundError itself, which is handled below.
+            # The raw bytes are handed to the parser (orjson when available), which decodes
+            # UTF-8 itself; large files are memory-mapped rather than read into memory.
+            json_data = self._load_json_data(file_path)
 
-            # Step 2: Read and parse the JSON data from the file.
-            # Using 'utf-8' encoding is a good practice for broad compatibility.
-            with open(file_path, 'r', encoding='utf-8') as f:
-                json_data = json.load(f)
+            logger.info("JSONAgent: Successfully loaded JSON data from %s.", file_path)
 
-            logger.info(f"JSONAgent: Successfully loaded JSON data from {file_path}.")
+            # Steps 3 & 4: Extract and reformat data based on the TARGET_SCHEMA, and identify any
+            # top-level fields that are missing in the loaded JSON data, in a single pass.
+            # This ensures that only relevant fields are carried forward, with `None` for missing ones.
+            reformatted_data = {}
+            missing_fields = []
+            get_field = json_data.get
+            for field in self.TARGET_SCHEMA_ORDER:
+                value = get_field(field, _MISSING)
+                if value is _MISSING:
+                    missing_fields.append(field)
+                    value = None
+                reformatted_data[field] = value
 
-            # Step 3: Identify any top-level fields from the TARGET_SCHEMA that are missing
-            # in the loaded JSON data.
-            missing_fields = [field for field in self.TARGET_SCHEMA if field not in json_data]
             if missing_fields:
-                logger.warning(f"JSONAgent: Missing required fields in input data: {missing_fields}")
+                logger.warning("JSONAgent: Missing required fields in input data: %s", missing_fields)
                 result['missing_fields'] = missing_fields
 
-            # Step 4: Extract and reformat data based on the TARGET_SCHEMA.
-            # This ensures that only relevant fields are carried forward, with `None` for missing ones.
-            reformatted_data = {field: json_data.get(field, None) for field in self.TARGET_SCHEMA}
+                # A record missing a required field is rejected outright; validating the
+                # rest of it would only produce errors for data that cannot be used anyway.
+                missing_required = [field for field in missing_fields if field in self.REQUIRED_FIELDS]
+                if missing_required:
+                    logger.warning("JSONAgent: Rejecting %s; missing required fields: %s", file_path, missing_required)
+                    result['error_message'] = f"Missing required fields: {missing_required}"
+                    result['status'] = 'invalid_schema'
+                    result['processed_data'] = reformatted_data
+                    return result
 
             # Step 5: Perform deeper, specific validation for individual fields.
-
-            # Validate the 'customer' field: ensure it's a dictionary and contains expected nested keys.
-            if 'customer' in reformatted_data and reformatted_data['customer'] is not None:
-                if not isinstance(reformatted_data['customer'], dict):
-                    warning_msg = f"JSONAgent: 'customer' field is not a dictionary. Type: {type(reformatted_data['customer'])}"
-                    logger.warning(warning_msg)
-                    result['validation_errors'].append(warning_msg)
-                else:
-                    # Check for essential nested fields within the 'customer' dictionary.
-                    if 'name' not in reformatted_data['customer'] or 'email' not in reformatted_data['customer']:
-                        warning_msg = "JSONAgent: 'customer' dictionary is missing 'name' or 'email'."
-                        logger.warning(warning_msg)
-                        result['validation_errors'].append(warning_msg)
-
-            # Validate the 'amount' field: attempt to convert it to a float.
-            if 'amount' in reformatted_data and reformatted_data['amount'] is not None:
-                try:
-                    reformatted_data['amount'] = float(reformatted_data['amount'])
-                except (ValueError, TypeError):
-                    warning_msg = f"JSONAgent: 'amount' field '{reformatted_data['amount']}' is not a valid number."
-                    logger.warning(warning_msg)
-                    result['validation_errors'].append(warning_msg)
-
-            # Validate the 'id' field: ensure it is either a string or an integer.
-            if 'id' in reformatted_data and reformatted_data['id'] is not None:
-                if not isinstance(reformatted_data['id'], (str, int)):
-                    warning_msg = f"JSONAgent: 'id' field '{reformatted_data['id']}' is not a valid string or integer."
-                    logger.warning(warning_msg)
-                    result['validation_errors'].append(warning_msg)
+            # Records accepted by the compiled schema validator need no further checks beyond
+            # normalizing 'amount'; everything else goes through the detailed checks in _validate_record.
+            if self._passes_compiled_schema(reformatted_data):
+                # The schema only admits numbers here, so at most an int needs widening.
+                amount = reformatted_data['amount']
+                if type(amount) is not float and amount is not None:
+                    reformatted_data['amount'] = float(amount)
+            else:
+                _validate_record(reformatted_data, result['validation_errors'])
 
             # If execution reaches here, the file was successfully loaded and basic processing completed.
             # Set success to True, even if validation errors or missing non-critical fields exist.
@@ -131,28 +315,131 @@ class JsonAgent:
             result['status'] = 'processed'
             result['processed_data'] = reformatted_data
 
-            logger.info(f"JSONAgent: Successfully processed data for {file_path}. Status: {result['status']}")
+            logger.info("JSONAgent: Successfully processed data for %s. Status: %s", file_path, result['status'])
             return result
 
         except FileNotFoundError as e:
             # Handle cases where the specified file does not exist.
-            logger.error(f"JSONAgent: {e}")
+            logger.error("JSONAgent: %s", e)
             result['error_message'] = str(e)
             result['status'] = 'file_not_found'
             return result
-        except json.JSONDecodeError as e:
+        except json_utils.JSONDecodeError as e:
             # Handle cases where the file contains invalid JSON syntax.
-            logger.error(f"JSONAgent: Invalid JSON format in {file_path}: {e}")
+            logger.error("JSONAgent: Invalid JSON format in %s: %s", file_path, e)
             result['error_message'] = f"Invalid JSON format: {e}"
             result['status'] = 'invalid_json'
             return result
         except Exception as e:
             # Catch any other unexpected errors during the processing.
-            logger.error(f"JSONAgent: An unexpected error occurred while processing JSON file {file_path}: {str(e)}")
+            logger.error("JSONAgent: An unexpected error occurred while processing JSON file %s: %s", file_path, e)
             result['error_message'] = str(e)
             result['status'] = 'processing_failed'
             return result
 
+    def process_many(self, file_paths: List[str], max_workers: int = 8) -> List[Dict[str, Any]]:
+        """
+        Processes a batch of JSON files, e.g. a directory of invoices.
+
+        Read-ahead for every file is requested up front, and the files are then handled by
+        process_json from a pool of up to `max_workers` threads, so reads that block on the
+        disk overlap with parsing and validation of other files.
+
+        Args:
+            file_paths (List[str]): Paths of the JSON files to process.
+            max_workers (int): Maximum number of files processed concurrently; 1 processes
+                               them sequentially in the calling thread.
+
+        Returns:
+            List[Dict[str, Any]]: One process_json result per path, in input order.
+        """
+        file_paths = list(file_paths)
+        if not file_paths:
+            return []
+
+        _prefetch_files(file_paths)
+
+        workers = max(1, min(max_workers, len(file_paths)))
+        if workers == 1:
+            return [self.process_json(file_path) for file_path in file_paths]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.process_json, file_paths))
+
+    def _load_json_data(self, file_path: str) -> Any:
+        """
+        Parses a JSON file, streaming it with ijson if it exceeds STREAMING_THRESHOLD_BYTES.
+
+        Args:
+            file_path (str): Path of the JSON file.
+
+        Returns:
+            Any: The parsed document; for streamed files, a dict holding only the top-level
+                 TARGET_SCHEMA fields that were found.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            json_utils.JSONDecodeError: If the file is not valid JSON.
+        """
+        if not _ijson_available or os.stat(file_path).st_size <= self.STREAMING_THRESHOLD_BYTES:
+            return json_utils.load_file(file_path)
+
+        logger.info("JSONAgent: Streaming oversized file %s; only schema fields are kept.", file_path)
+        collected = {}
+        needed = set(self.TARGET_SCHEMA_SET)
+        try:
+            with open(file_path, 'rb') as f:
+                for key, value in ijson.kvitems(f, '', use_float=True):
+                    if key in needed:
+                        collected[key] = value
+                        needed.discard(key)
+                        if not needed:
+                            break
+        except ijson.JSONError as e:
+            raise json_utils.JSONDecodeError(str(e), '', 0) from e
+        return collected
+
+    def _passes_compiled_schema(self, data: Dict[str, Any]) -> bool:
+        """
+        Runs the compiled TARGET_JSON_SCHEMA validator over the reformatted data.
+
+        Args:
+            data (Dict[str, Any]): The reformatted record.
+
+        Returns:
+            bool: True if the record is known to be valid, False if it failed the schema or
+                  no compiled validator is available (the detailed checks then decide).
+        """
+        if self._validator is None:
+            return False
+        try:
+            self._validator(data)
+            return True
+        except fastjsonschema.JsonSchemaException:
+            return False
+
+_AGENT_SINGLETON = None
+_AGENT_SINGLETON_LOCK = threading.Lock()
+
+
+def get_agent() -> JsonAgent:
+    """
+    Returns the shared JsonAgent instance, creating it on first use.
+
+    The agent holds no per-file state, so one instance (and its compiled validator) can
+    serve every caller. Prefer `get_agent().process_json(...)` over constructing a new
+    JsonAgent per request.
+
+    Returns:
+        JsonAgent: The process-wide JsonAgent.
+    """
+    global _AGENT_SINGLETON
+    if _AGENT_SINGLETON is None:
+        with _AGENT_SINGLETON_LOCK:
+            if _AGENT_SINGLETON is None:
+                _AGENT_SINGLETON = JsonAgent()
+    return _AGENT_SINGLETON
+
+
 if __name__ == "__main__":
     # Configure basic logging to display informative messages to the console
     # when the script is executed directly for testing purposes.
@@ -164,7 +451,7 @@ if __name__ == "__main__":
         ]
     )
 
-    json_agent = JsonAgent()
+    json_agent = get_agent()
 
     # Ensure the 'sample_inputs' directory exists to store test JSON files.
     if not os.path.exists('sample_inputs'):
@@ -192,7 +479,7 @@ if __name__ == "__main__":
         json.dump(valid_json_content, f, indent=4)
     print(f"\n--- Testing Valid JSON: {valid_json_path} ---")
     result_valid = json_agent.process_json(valid_json_path)
-    print(json.dumps(result_valid, indent=2))
+    print(json_utils.dumps(result_valid, indent=True))
 
     # Test Case 2: JSON file with some required fields missing from TARGET_SCHEMA.
     missing_fields_json_path = "sample_inputs/missing_fields_invoice.json"
@@ -209,7 +496,7 @@ if __name__ == "__main__":
         json.dump(missing_fields_json_content, f, indent=4)
     print(f"\n--- Testing JSON with Missing Fields: {missing_fields_json_path} ---")
     result_missing = json_agent.process_json(missing_fields_json_path)
-    print(json.dumps(result_missing, indent=2))
+    print(json_utils.dumps(result_missing, indent=True))
 
     # Test Case 3: JSON file with invalid format (e.g., incorrect syntax).
     invalid_json_path = "sample_inputs/invalid_format.json"
@@ -217,13 +504,13 @@ if __name__ == "__main__":
         f.write("{'id': 'INV-003', 'amount': 100.00,}") # Deliberately invalid JSON (single quotes, trailing comma)
     print(f"\n--- Testing Invalid JSON Format: {invalid_json_path} ---")
     result_invalid_format = json_agent.process_json(invalid_json_path)
-    print(json.dumps(result_invalid_format, indent=2))
+    print(json_utils.dumps(result_invalid_format, indent=True))
 
     # Test Case 4: Attempt to process a file that does not exist.
     non_existent_path = "sample_inputs/non_existent.json"
     print(f"\n--- Testing Non-Existent File: {non_existent_path} ---")
     result_non_existent = json_agent.process_json(non_existent_path)
-    print(json.dumps(result_non_existent, indent=2))
+    print(json_utils.dumps(result_non_existent, indent=True))
 
     # Test Case 5: JSON file where 'customer' field is of an incorrect type (string instead of dict).
     invalid_customer_json_path = "sample_inputs/invalid_customer.json"
@@ -237,7 +524,7 @@ if __name__ == "__main__":
         json.dump(invalid_customer_json_content, f, indent=4)
     print(f"\n--- Testing JSON with Invalid Customer Format: {invalid_customer_json_path} ---")
     result_invalid_customer = json_agent.process_json(invalid_customer_json_path)
-    print(json.dumps(result_invalid_customer, indent=2))
+    print(json_utils.dumps(result_invalid_customer, indent=True))
 
     # Test Case 6: JSON file with 'customer' as a dictionary but missing required nested fields ('email').
     missing_nested_customer_json_path = "sample_inputs/missing_nested_customer.json"
@@ -253,7 +540,7 @@ if __name__ == "__main__":
         json.dump(missing_nested_customer_json_content, f, indent=4)
     print(f"\n--- Testing JSON with Missing Nested Customer Fields: {missing_nested_customer_json_path} ---")
     result_missing_nested_customer = json_agent.process_json(missing_nested_customer_json_path)
-    print(json.dumps(result_missing_nested_customer, indent=2))
+    print(json_utils.dumps(result_missing_nested_customer, indent=True))
 
     # Clean up all created test files after execution.
     for f in [valid_json_path, missing_fields_json_path, invalid_json_path, invalid_customer_json_path, missing_nested_customer_json_path]:
@@ -1,18 +1,43 @@
 import logging
+import hashlib
 import json
 import os
-from typing import Dict, Any, Optional
+import re
+import sys
+from contextlib import nullcontext
+from typing import Dict, Any, List, Optional
 import pdfplumber
 from datetime import datetime
-import re
 
-import sys
-import os
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _PROJECT_ROOT not in sys.path:
+    sys.path.append(_PROJECT_ROOT)
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import json_utils
+from utils.file_utils import (MAX_EXTRACTION_WORKERS, PARALLEL_PAGE_THRESHOLD, pdf_text_extractor,
+                              pdfplumber_page_texts, pymupdf_page_texts)
 
 logger = logging.getLogger(__name__)
 
+# Bump when the shape or content of process_pdf results changes, so stale cache entries
+# written by an older version are ignored. The extractor in use (and, for PyMuPDF,
+# `min_fast_chars_per_page`) is part of the cache key as well, see `_result_cache_path`.
+_RESULT_CACHE_VERSION = 1
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# Every PDF starts with this signature; readers tolerate up to 1KB of junk before it.
+_PDF_MAGIC = b'%PDF-'
+_PDF_MAGIC_SEARCH_BYTES = 1024
+
+# Page markers inserted by `extract_text_from_pdf`, stripped again by `preprocess_text`.
+_PAGE_MARKER_PREFIX = '--- Page '
+_PAGE_MARKER_OPEN = '\n' + _PAGE_MARKER_PREFIX
+_PAGE_MARKER_CLOSE = ' ---\n'
+_PAGE_MARKER_RE = re.compile(r'--- Page \d+ ---')
+# Extra normalized characters required beyond the truncation length before a bounded window
+# of the text is trusted; comfortably longer than any page marker.
+_TRUNCATION_MARGIN = 64
+
 _file_utils_available = False
 try:
     from utils.file_utils import validate_file_path, get_file_info
@@ -45,14 +70,23 @@ class PDFAgent:
         self.agent_name = "PDF_Agent"
         self.supported_extensions = ['.pdf']
         self.file_utils_available = _file_utils_available
+        # PDFs with at least this many pages have their pages extracted in parallel by up to
+        # `max_extraction_workers` processes; smaller ones are not worth the process start-up.
+        self.parallel_page_threshold = PARALLEL_PAGE_THRESHOLD
+        self.max_extraction_workers = MAX_EXTRACTION_WORKERS
+        # Fast (PyMuPDF) extraction results averaging fewer non-whitespace characters per page
+        # than this are treated as suspect, and the pages are re-extracted with pdfplumber.
+        self.min_fast_chars_per_page = 10
+        # Successful results are cached on disk, keyed by the SHA-256 of the PDF's bytes, so
+        # unchanged files are not re-processed across runs. An empty value disables the cache.
+        self.cache_dir = os.environ.get("PDF_AGENT_CACHE_DIR", os.path.join(".cache", "pdf"))
 
     def validate_pdf_file(self, file_path: str) -> bool:
         """
         Validates a given file path to ensure it points to an existing and valid PDF document.
 
-        This method first checks for file existence and extension. If external file utilities
-        are available, it leverages them for initial path validation. Finally, it attempts
-        to open the PDF with `pdfplumber` to confirm its structural integrity.
+        This method first checks the file extension, then attempts to open the PDF with
+        `pdfplumber`, which both confirms the file exists and verifies its structural integrity.
 
         Args:
             file_path (str): The path to the PDF file to be validated.
@@ -60,79 +94,126 @@ class PDFAgent:
         Returns:
             bool: True if the file is a valid and accessible PDF, False otherwise.
         """
+        pdf = self._open_validated_pdf(file_path)
+        if pdf is None:
+            return False
+        pdf.close()
+        return True
+
+    def _open_validated_pdf(self, file_path: str):
+        """
+        Performs the checks of `validate_pdf_file` and hands back the opened document.
+
+        The structural check already has to open the PDF with `pdfplumber`, so returning
+        that handle lets `process_pdf` reuse it for text and metadata extraction instead of
+        parsing the file again for each step.
+
+        Args:
+            file_path (str): The path to the PDF file to be validated.
+
+        Returns:
+            The open `pdfplumber.PDF` if the file is a valid PDF (the caller must close it),
+            None otherwise.
+        """
         try:
-            # Step 1: Use external file utilities for initial validation if available.
-            if self.file_utils_available:
-                if not validate_file_path(file_path):
-                    logger.error(f"File validation failed (using file_utils): {file_path}")
-                    return False
-            else:
-                # Fallback to built-in Python file existence check.
-                if not os.path.exists(file_path):
-                    logger.error(f"File not found: {file_path}")
-                    return False
-
-            # Step 2: Validate the file extension to ensure it's a PDF.
+            # Step 1: Validate the file extension to ensure it's a PDF.
             _, ext = os.path.splitext(file_path)
             if ext.lower() not in self.supported_extensions:
                 logger.error(f"Unsupported file extension: '{ext}' for PDF processing in '{file_path}'")
-                return False
+                return None
+
+            # Step 2: Check the PDF signature, so files that are not PDFs at all are rejected
+            # with one small read instead of a full pdfminer parse attempt.
+            with open(file_path, 'rb') as f:
+                head = f.read(_PDF_MAGIC_SEARCH_BYTES)
+            if _PDF_MAGIC not in head:
+                logger.error(f"File '{file_path}' does not have a PDF signature; not a valid PDF.")
+                return None
 
             # Step 3: Attempt to open the PDF with pdfplumber to verify its integrity.
-            # This implicitly checks for PDF syntax errors or corruption.
-            with pdfplumber.open(file_path) as pdf:
+            # This implicitly checks for PDF syntax errors or corruption. There is no separate
+            # existence check: a missing file or a directory is reported by the open itself.
+            pdf = pdfplumber.open(file_path)
+            try:
                 # Log a warning if the PDF contains no pages, but still consider it valid
                 # as extraction will handle the absence of text.
                 if len(pdf.pages) == 0:
                     logger.warning(f"PDF file '{file_path}' has no pages or appears empty.")
                     # An empty PDF is still technically a valid PDF, just without content.
                     pass
+            except Exception:
+                pdf.close()
+                raise
 
             logger.info(f"PDF validation successful: {file_path}")
-            return True
+            return pdf
 
+        except FileNotFoundError:
+            logger.error(f"File not found: {file_path}")
+            return None
+        except IsADirectoryError:
+            logger.error(f"Path is not a file: {file_path}")
+            return None
         except pdfplumber.PDFSyntaxError as e:
             # Catch specific errors indicating a malformed or corrupted PDF.
             logger.error(f"PDF syntax error in '{file_path}': {e}. File might be corrupted or not a valid PDF.")
-            return False
+            return None
         except Exception as e:
             # Catch any other unexpected errors during validation.
             logger.error(f"PDF validation failed for '{file_path}': {str(e)}")
-            return False
+            return None
 
-    def extract_text_from_pdf(self, file_path: str) -> Optional[str]:
+    def extract_text_from_pdf(self, file_path: str, pdf=None) -> Optional[str]:
         """
         Extracts all textual content from a PDF file, page by page.
 
-        Each page's text is appended to a collective string, with page markers
-        inserted for potential later processing or debugging.
+        Each page's text is collected in order and joined into a single string at the end,
+        with page markers inserted for potential later processing or debugging.
 
         Args:
             file_path (str): The path to the PDF file from which to extract text.
+            pdf (Optional[pdfplumber.PDF]): An already-open handle for `file_path`. When given it
+                                            is used (and left open) instead of opening the file again.
 
         Returns:
             Optional[str]: The concatenated text extracted from all pages,
                            or None if no text could be extracted or the PDF is empty.
         """
-        extracted_text = ""
+        parts = []
         try:
-            with pdfplumber.open(file_path) as pdf:
-                if len(pdf.pages) == 0:
+            with (pdfplumber.open(file_path) if pdf is None else nullcontext(pdf)) as pdf:
+                # `pdf.pages` builds the page list on first access; bind it once and reuse it.
+                pages = pdf.pages
+                page_count = len(pages)
+                if page_count == 0:
                     logger.warning(f"No pages found in PDF: {file_path}. No text to extract.")
                     return None
 
-                logger.info(f"Processing PDF with {len(pdf.pages)} pages")
-
-                for page_num, page in enumerate(pdf.pages, 1):
-                    page_text = page.extract_text()
+                logger.info(f"Processing PDF with {page_count} pages")
 
+                page_texts = self._fast_extract_page_texts(file_path)
+                if page_texts is None:
+                    page_texts = self._extract_page_texts(file_path, pages)
+                # Pages without text are collected and reported in a single warning.
+                blank_pages = []
+                append = parts.append
+                for page_num, page_text in enumerate(page_texts, 1):
                     if page_text:
                         # Include page markers for structural awareness in the extracted text.
-                        extracted_text += f"\n--- Page {page_num} ---\n"
-                        extracted_text += page_text
-                        logger.debug(f"Extracted text from page {page_num}")
+                        # The marker is appended in pieces rather than formatted per page.
+                        append(_PAGE_MARKER_OPEN)
+                        append(str(page_num))
+                        append(_PAGE_MARKER_CLOSE)
+                        append(page_text)
+                        logger.debug("Extracted text from page %d", page_num)
                     else:
-                        logger.warning(f"No text found on page {page_num} of {file_path}")
+                        blank_pages.append(page_num)
+
+                if blank_pages:
+                    logger.warning("No text found on page(s) %s of %s", blank_pages, file_path)
+
+            # Joining once keeps this linear in the text size, unlike repeated `+=`.
+            extracted_text = ''.join(parts)
 
             # Return None if, after processing all pages, no significant text was found.
             if not extracted_text.strip():
@@ -147,6 +228,46 @@ class PDFAgent:
             logger.error(f"Text extraction failed for '{file_path}': {str(e)}")
             return None
 
+    def _fast_extract_page_texts(self, file_path: str) -> Optional[List[str]]:
+        """
+        Extracts the text of every page with PyMuPDF, if it is installed.
+
+        Args:
+            file_path (str): The path to the PDF file.
+
+        Returns:
+            Optional[List[str]]: The text of each page in order, or None if PyMuPDF is not
+                                 available, fails on the file, or returns suspiciously little
+                                 text (e.g. a PDF whose text layer it cannot read); the caller
+                                 then falls back to pdfplumber.
+        """
+        page_texts = pymupdf_page_texts(file_path)
+        if page_texts is None:
+            return None
+
+        text_chars = sum(len(''.join(page_text.split())) for page_text in page_texts)
+        if text_chars < self.min_fast_chars_per_page * len(page_texts):
+            logger.info(f"PyMuPDF returned little text for '{file_path}'; re-extracting with pdfplumber.")
+            return None
+        return page_texts
+
+    def _extract_page_texts(self, file_path: str, pages) -> List[Optional[str]]:
+        """
+        Returns the text of every page of an open PDF, in page order.
+
+        Delegates to `file_utils.pdfplumber_page_texts` with this agent's parallelism settings:
+        large documents are extracted concurrently in a process pool, smaller ones sequentially
+        from the open handle.
+
+        Args:
+            file_path (str): The path to the PDF file, re-opened by the worker processes.
+            pages (List[pdfplumber.page.Page]): The pages of the open document.
+
+        Returns:
+            List[Optional[str]]: The text of each page, as returned by `extract_text()`.
+        """
+        return pdfplumber_page_texts(file_path, pages, self.parallel_page_threshold, self.max_extraction_workers)
+
     def preprocess_text(self, text: str) -> str:
         """
         Performs basic preprocessing on the extracted text to normalize it.
@@ -160,14 +281,21 @@ class PDFAgent:
             str: The preprocessed and potentially truncated text.
         """
         try:
-            # Normalize whitespace: replace multiple spaces/newlines with a single space.
-            processed_text = ' '.join(text.split())
-
-            # Remove custom page markers added during the extraction phase.
-            processed_text = re.sub(r'--- Page \d+ ---', '', processed_text).strip()
-
             # Define a maximum length for the text, useful for LLM context windows.
             max_length = 4000
+
+            # Only a prefix of a long text survives truncation, so normalize a bounded window
+            # instead of the whole document. The window grows only if it was mostly whitespace
+            # or markers; the margin keeps a word or marker cut at the window edge past the
+            # truncation point, so the result is identical to normalizing the full text.
+            window = max_length * 4
+            while True:
+                chunk = text if len(text) <= window else text[:window]
+                processed_text = self._normalize_text(chunk)
+                if chunk is text or len(processed_text) > max_length + _TRUNCATION_MARGIN:
+                    break
+                window *= 4
+
             if len(processed_text) > max_length:
                 processed_text = processed_text[:max_length] + "..."
                 logger.info(f"Text truncated to {max_length} characters for processing")
@@ -179,12 +307,35 @@ class PDFAgent:
             logger.error(f"Text preprocessing failed: {str(e)}")
             return text
 
-    def extract_metadata(self, file_path: str) -> Dict[str, Any]:
+    @staticmethod
+    def _normalize_text(text: str) -> str:
+        """
+        Collapses whitespace and strips the page markers inserted by `extract_text_from_pdf`.
+
+        Args:
+            text (str): Raw extracted text.
+
+        Returns:
+            str: The normalized text.
+        """
+        # Normalize whitespace: replace multiple spaces/newlines with a single space.
+        # str.split()/join both run in C and beat a `\s+` regex substitution several-fold.
+        normalized = ' '.join(text.split())
+
+        # Remove custom page markers added during the extraction phase. Text without any
+        # marker (e.g. not produced by `extract_text_from_pdf`) skips the regex entirely.
+        if _PAGE_MARKER_PREFIX in normalized:
+            normalized = _PAGE_MARKER_RE.sub('', normalized)
+        return normalized.strip()
+
+    def extract_metadata(self, file_path: str, pdf=None) -> Dict[str, Any]:
         """
         Extracts various metadata fields from a PDF file using `pdfplumber` and OS file system.
 
         Args:
             file_path (str): The path to the PDF file.
+            pdf (Optional[pdfplumber.PDF]): An already-open handle for `file_path`. When given it
+                                            is used (and left open) instead of opening the file again.
 
         Returns:
             Dict[str, Any]: A dictionary containing extracted metadata such as file size,
@@ -201,13 +352,14 @@ class PDFAgent:
         }
 
         try:
-            # Retrieve file size using OS utilities.
-            if os.path.exists(file_path):
-                metadata['file_size'] = os.path.getsize(file_path)
-            else:
-                logger.warning(f"File not found when trying to get size for metadata: {file_path}")
+            with (pdfplumber.open(file_path) if pdf is None else nullcontext(pdf)) as pdf:
+                # Retrieve file size from the descriptor pdfplumber already holds, which
+                # needs no path lookup; fall back to a single stat of the path otherwise.
+                try:
+                    metadata['file_size'] = os.fstat(pdf.stream.fileno()).st_size
+                except (AttributeError, OSError, ValueError):
+                    metadata['file_size'] = os.stat(file_path).st_size
 
-            with pdfplumber.open(file_path) as pdf:
                 metadata['pages_count'] = len(pdf.pages)
 
                 # Extract standard PDF metadata fields.
@@ -252,27 +404,39 @@ class PDFAgent:
         try:
             logger.info(f"Starting PDF processing: {file_path}")
 
-            # Step 1: Validate the PDF file before proceeding.
-            if not self.validate_pdf_file(file_path):
-                # If validation fails, an error message would have been logged by validate_pdf_file.
+            # Step 0: Reuse the stored result if this exact content has been processed before.
+            cache_path = self._result_cache_path(file_path)
+            if cache_path is not None:
+                cached = self._load_cached_result(cache_path, file_path, result['timestamp'])
+                if cached is not None:
+                    logger.info(f"PDF processing served from cache: {file_path}")
+                    return cached
+
+            # Step 1: Validate the PDF file before proceeding. The document opened by the
+            # validation is kept and shared by the text and metadata steps, so the file is
+            # parsed only once.
+            pdf = self._open_validated_pdf(file_path)
+            if pdf is None:
+                # If validation fails, an error message would have been logged during validation.
                 result['error_message'] = result.get('error_message', "PDF validation failed for unknown reason.")
                 return result
 
-            # Step 2: Extract raw text content from the PDF.
-            raw_text = self.extract_text_from_pdf(file_path)
+            with pdf:
+                # Step 2: Extract raw text content from the PDF.
+                raw_text = self.extract_text_from_pdf(file_path, pdf=pdf)
+
+                # Step 3: Extract metadata from the PDF. This is done even if no text was
+                # extracted (e.g., image-only PDF), as it might be relevant regardless.
+                metadata = self.extract_metadata(file_path, pdf=pdf)
+
             if raw_text is None:
-                # If no text is extracted (e.g., image-only PDF), still attempt metadata extraction
-                # as it might be relevant even without textual content.
                 result['error_message'] = "Text extraction failed or no readable text found in PDF."
-                result['metadata'] = self.extract_metadata(file_path)
+                result['metadata'] = metadata
                 return result
 
-            # Step 3: Preprocess the extracted raw text for normalization.
+            # Step 4: Preprocess the extracted raw text for normalization.
             processed_text = self.preprocess_text(raw_text)
 
-            # Step 4: Extract metadata from the PDF.
-            metadata = self.extract_metadata(file_path)
-
             # Mark the process as successful and populate the result dictionary.
             result.update({
                 'success': True,
@@ -281,6 +445,9 @@ class PDFAgent:
                 'text_length': len(processed_text)
             })
 
+            if cache_path is not None:
+                self._store_cached_result(cache_path, result)
+
             logger.info(f"PDF processing completed successfully: {file_path}")
             return result
 
@@ -290,6 +457,86 @@ class PDFAgent:
             result['error_message'] = str(e)
             return result
 
+    def _result_cache_path(self, file_path: str) -> Optional[str]:
+        """
+        Computes where the cached result for a PDF's current content is stored.
+
+        The key covers the content hash and the extraction settings that shape the text: the
+        extractor tried first (PyMuPDF or pdfplumber) and the PyMuPDF little-text threshold.
+
+        Args:
+            file_path (str): The path to the PDF file.
+
+        Returns:
+            Optional[str]: The cache file path, or None if caching is disabled, the file does
+                           not have a supported extension, or it cannot be read (processing
+                           then proceeds normally and reports the problem).
+        """
+        if not self.cache_dir:
+            return None
+        _, ext = os.path.splitext(file_path)
+        if ext.lower() not in self.supported_extensions:
+            return None
+
+        digest = hashlib.sha256()
+        try:
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+        except OSError:
+            return None
+        extractor = pdf_text_extractor()
+        if extractor == "pymupdf":
+            extractor += str(self.min_fast_chars_per_page)
+        return os.path.join(self.cache_dir, f"v{_RESULT_CACHE_VERSION}-{extractor}-{digest.hexdigest()}.json")
+
+    def _load_cached_result(self, cache_path: str, file_path: str, timestamp: str) -> Optional[Dict[str, Any]]:
+        """
+        Loads a cached result and re-targets it at the file currently being processed.
+
+        Args:
+            cache_path (str): The cache file for the PDF's content.
+            file_path (str): The path the PDF is being processed from.
+            timestamp (str): Timestamp of the current processing run.
+
+        Returns:
+            Optional[Dict[str, Any]]: The cached result, or None on a miss or unreadable entry.
+        """
+        try:
+            with open(cache_path, 'rb') as f:
+                cached = json_utils.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable PDF cache entry '{cache_path}': {str(e)}")
+            return None
+
+        # The same content may have been cached under a different path or name.
+        cached['timestamp'] = timestamp
+        cached['file_path'] = file_path
+        if cached.get('metadata'):
+            cached['metadata']['file_path'] = file_path
+            cached['metadata']['file_name'] = os.path.basename(file_path)
+        return cached
+
+    def _store_cached_result(self, cache_path: str, result: Dict[str, Any]) -> None:
+        """
+        Writes a successful result to the cache. Failures are logged and otherwise ignored.
+
+        Args:
+            cache_path (str): The cache file for the PDF's content.
+            result (Dict[str, Any]): The result returned by `process_pdf`.
+        """
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(json_utils.dumps(result, default=str))
+            # Atomic rename, so concurrent readers never see a partially written entry.
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning(f"Could not write PDF cache entry '{cache_path}': {str(e)}")
+
 if __name__ == "__main__":
     # Configure basic logging to output informational messages to the console
     # when this script is run directly. This is useful for testing and debugging.
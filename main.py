@@ -1,15 +1,14 @@
 import os
 import sys
+import asyncio
 import logging
 from datetime import datetime
+from functools import cached_property
+from typing import Tuple
 
 # Extend system path to include project root for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from agents.pdf_agent import PDFAgent
-from agents.classifier_agent import ClassifierAgent
-from agents.email_agent import EmailAgent
-from agents.json_agent import JsonAgent
 from memory.shared_memory import SharedMemory
 
 # Configure logging to output to both console and file
@@ -29,45 +28,93 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Markers that suggest a text is an email; two or more matches are treated as an email.
+# Headers live at the top, so only the first EMAIL_SCAN_LIMIT characters are inspected.
+EMAIL_INDICATORS = ('from:', 'to:', 'subject:', 'dear', '@', 'sent:', 'date:')
+EMAIL_SCAN_LIMIT = 4096
+
+_BANNER = '=' * 60
+
+def new_conversation_stamp(prefix: str) -> Tuple[str, str]:
+    """Return a (conversation_id, timestamp) pair derived from a single clock read."""
+    now = datetime.now()
+    return f"{prefix}_{now:%Y%m%d_%H%M%S}", now.isoformat()
+
 class DocumentProcessor:
     """Coordinator class for managing document processing using multiple agents."""
 
     def __init__(self):
-        self.pdf_agent = PDFAgent()
-        self.classifier_agent = ClassifierAgent()
-        self.email_agent = EmailAgent()
-        self.json_agent = JsonAgent()
         self.shared_memory = SharedMemory()
+        # Results are buffered here and handed to shared memory in one batch by flush_results().
+        # Outside process_sample_inputs each process_* call flushes its own result right away.
+        self._pending_results = []
+        self._defer_flush = False
         os.makedirs('output_logs', exist_ok=True)
 
+    # Agents are imported and constructed on first use, so a run that only touches some file
+    # types does not pay for the others (e.g. pdfplumber imports, the Ollama probe).
+
+    @cached_property
+    def pdf_agent(self):
+        from agents.pdf_agent import PDFAgent
+        return PDFAgent()
+
+    @cached_property
+    def classifier_agent(self):
+        from agents.classifier_agent import ClassifierAgent
+        return ClassifierAgent()
+
+    @cached_property
+    def email_agent(self):
+        from agents.email_agent import EmailAgent
+        return EmailAgent()
+
+    @cached_property
+    def json_agent(self):
+        from agents.json_agent import get_agent
+        return get_agent()
+
+    def flush_results(self):
+        """Store all buffered results in shared memory with a single write."""
+        if self._pending_results:
+            pending, self._pending_results = self._pending_results, []
+            self.shared_memory.store_result_batch(pending)
+
+    def _queue_result(self, combined_result: dict):
+        """Buffer a result for shared memory; it is stored at once unless a batch is running."""
+        self._pending_results.append(combined_result)
+        if not self._defer_flush:
+            self.flush_results()
+
     def process_pdf_document(self, file_path: str) -> dict:
         """Extract and classify content from a PDF document."""
-        logger.info(f"=== Processing PDF Document: {file_path} ===")
+        logger.info("=== Processing PDF Document: %s ===", file_path)
 
         try:
             logger.info("Step 1: Extracting text using PDF Agent")
             pdf_result = self.pdf_agent.process_pdf(file_path)
 
             if not pdf_result['success']:
-                logger.error(f"PDF processing failed: {pdf_result['error_message']}")
+                logger.error("PDF processing failed: %s", pdf_result['error_message'])
                 return pdf_result
 
             extracted_text = pdf_result['extracted_text']
-            logger.info(f"Extracted text length: {len(extracted_text)} characters")
+            logger.info("Extracted text length: %d characters", len(extracted_text))
 
             logger.info("Step 2: Classifying content using Classifier Agent")
             classification_result = self.classifier_agent.classify_document(extracted_text)
 
             if not classification_result['success']:
-                logger.error(f"Classification failed: {classification_result['error_message']}")
+                logger.error("Classification failed: %s", classification_result['error_message'])
                 return classification_result
 
-            logger.info(f"Classification result: {classification_result['document_type']} "
-                        f"(confidence: {classification_result['confidence']}, "
-                        f"method: {classification_result['method_used']})")
+            logger.info("Classification result: %s (confidence: %s, method: %s)",
+                        classification_result['document_type'], classification_result['confidence'],
+                        classification_result['method_used'])
 
+            conversation_id, timestamp = new_conversation_stamp('pdf')
             combined_result = {
-                'conversation_id': f"pdf_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                'conversation_id': conversation_id,
                 'source': file_path,
                 'type': 'PDF_DOCUMENT',
                 'document_type': classification_result['document_type'],
@@ -76,12 +123,12 @@ class DocumentProcessor:
                 'extracted_text': extracted_text[:500] + "..." if len(extracted_text) > 500 else extracted_text,
                 'extracted_info': classification_result.get('extracted_info', {}),
                 'pdf_metadata': pdf_result['metadata'],
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': timestamp,
                 'processing_agents': ['PDF_Agent', 'Classifier_Agent']
             }
 
-            self.shared_memory.store_result(combined_result)
-            logger.info("Stored results in shared memory")
+            self._queue_result(combined_result)
+            logger.info("Queued results for shared memory")
 
             return {
                 'success': True,
@@ -91,7 +138,7 @@ class DocumentProcessor:
             }
 
         except Exception as e:
-            logger.error(f"PDF processing error: {str(e)}")
+            logger.error("PDF processing error: %s", e)
             return {
                 'success': False,
                 'error_message': str(e)
@@ -99,7 +146,7 @@ class DocumentProcessor:
 
     def process_text_file(self, file_path: str) -> dict:
         """Process a plain text or email-like file for classification or parsing."""
-        logger.info(f"=== Processing Text File: {file_path} ===")
+        logger.info("=== Processing Text File: %s ===", file_path)
 
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
@@ -113,20 +160,21 @@ class DocumentProcessor:
                 result = self.classifier_agent.classify_document(text_content)
 
             if result['success']:
+                conversation_id, timestamp = new_conversation_stamp('text')
                 combined_result = {
-                    'conversation_id': f"text_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                    'conversation_id': conversation_id,
                     'source': file_path,
                     'type': 'TEXT_DOCUMENT',
                     'content': text_content[:500] + "..." if len(text_content) > 500 else text_content,
-                    'timestamp': datetime.now().isoformat()
+                    'timestamp': timestamp
                 }
                 combined_result.update(result)
-                self.shared_memory.store_result(combined_result)
+                self._queue_result(combined_result)
 
             return result
 
         except Exception as e:
-            logger.error(f"Text file processing error: {str(e)}")
+            logger.error("Text file processing error: %s", e)
             return {
                 'success': False,
                 'error_message': str(e)
@@ -134,25 +182,26 @@ class DocumentProcessor:
 
     def process_json_file(self, file_path: str) -> dict:
         """Delegate structured data processing to JSON Agent."""
-        logger.info(f"=== Processing JSON File: {file_path} ===")
+        logger.info("=== Processing JSON File: %s ===", file_path)
 
         try:
             result = self.json_agent.process_json(file_path)
 
             if result['success']:
+                conversation_id, timestamp = new_conversation_stamp('json')
                 combined_result = {
-                    'conversation_id': f"json_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                    'conversation_id': conversation_id,
                     'source': file_path,
                     'type': 'JSON_DOCUMENT',
-                    'timestamp': datetime.now().isoformat()
+                    'timestamp': timestamp
                 }
                 combined_result.update(result)
-                self.shared_memory.store_result(combined_result)
+                self._queue_result(combined_result)
 
             return result
 
         except Exception as e:
-            logger.error(f"JSON file processing error: {str(e)}")
+            logger.error("JSON file processing error: %s", e)
             return {
                 'success': False,
                 'error_message': str(e)
@@ -160,9 +209,14 @@ class DocumentProcessor:
 
     def is_email_format(self, text: str) -> bool:
         """Determine if the provided text resembles an email structure."""
-        email_indicators = ['from:', 'to:', 'subject:', 'dear', '@', 'sent:', 'date:']
-        text_lower = text.lower()
-        return sum(1 for indicator in email_indicators if indicator in text_lower) >= 2
+        text_lower = text[:EMAIL_SCAN_LIMIT].lower()
+        matches = 0
+        for indicator in EMAIL_INDICATORS:
+            if indicator in text_lower:
+                matches += 1
+                if matches >= 2:
+                    return True
+        return False
 
     def process_sample_inputs(self):
         """Run processing pipeline on predefined sample files."""
@@ -174,28 +228,57 @@ class DocumentProcessor:
 
         results = {}
 
+        # List each input directory once instead of stat-ing every sample file separately.
+        present = {}
+        for directory in {os.path.dirname(file_path) for file_path in sample_files}:
+            try:
+                with os.scandir(directory or '.') as entries:
+                    present[directory] = {entry.name for entry in entries}
+            except OSError:
+                present[directory] = set()
+
+        jobs = []
         for file_path, processor_func in sample_files.items():
-            if os.path.exists(file_path):
-                logger.info(f"\n{'='*60}")
-                logger.info(f"Processing: {file_path}")
-                logger.info(f"{'='*60}")
-
-                result = processor_func(file_path)
-                results[file_path] = result
-
-                if result['success']:
-                    logger.info("✅ Processing completed successfully")
-                else:
-                    logger.error(f"❌ Processing failed: {result.get('error_message', 'Unknown error')}")
+            if os.path.basename(file_path) in present[os.path.dirname(file_path)]:
+                logger.info("\n%s", _BANNER)
+                logger.info("Processing: %s", file_path)
+                logger.info(_BANNER)
+                jobs.append((file_path, processor_func))
+                # Reserve the slot so results keep the sample_files order.
+                results[file_path] = None
             else:
-                logger.warning(f"Sample file not found: {file_path}")
+                logger.warning("Sample file not found: %s", file_path)
                 results[file_path] = {
                     'success': False,
                     'error_message': 'File not found'
                 }
 
+        # Each file spends most of its time blocked on an Ollama round-trip, so the files
+        # are processed concurrently and the run takes roughly as long as the slowest one.
+        self._defer_flush = True
+        try:
+            job_results = asyncio.run(self._run_concurrently(jobs))
+        finally:
+            self._defer_flush = False
+        for (file_path, _), result in zip(jobs, job_results):
+            results[file_path] = result
+
+            if result['success']:
+                logger.info("✅ Processing completed successfully: %s", file_path)
+            else:
+                logger.error("❌ Processing failed: %s", result.get('error_message', 'Unknown error'))
+
+        self.flush_results()
         return results
 
+    @staticmethod
+    async def _run_concurrently(jobs) -> list:
+        """Run each (file_path, processor_func) job in a worker thread and gather the results in order."""
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(
+            *(loop.run_in_executor(None, processor_func, file_path) for file_path, processor_func in jobs)
+        )
+
     def print_summary(self, results: dict):
         """Display a concise summary of the processing outcomes."""
         print(f"\n{'='*60}")
@@ -234,7 +317,7 @@ def main():
         processor.print_summary(results)
         logger.info("Document processing completed. Review 'output_logs/' for logs.")
     except Exception as e:
-        logger.error(f"Fatal system error: {str(e)}")
+        logger.error("Fatal system error: %s", e)
         raise
 
 if __name__ == "__main__":
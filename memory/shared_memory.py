@@ -1,16 +1,37 @@
+import atexit
 import logging
-import json
 import os
+import sys
+import time
 from typing import List, Dict, Any
-from datetime import datetime
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _PROJECT_ROOT not in sys.path:
+    sys.path.append(_PROJECT_ROOT)
+
+from utils import json_utils
 
 # Initialize module-level logger
 logger = logging.getLogger(__name__)
 
 class SharedMemory:
-    # Static variables for log file path and in-memory log storage
-    _log_file = os.path.join("output_logs", "shared_memory.json")
+    # Static variables for log file paths and in-memory log storage.
+    # Entries are appended to _log_file as JSON Lines (one object per line), so storing a result
+    # costs one short write instead of rewriting the whole history; _compact() exports the
+    # full history as a JSON array to _snapshot_file on request.
+    _log_file = os.path.join("output_logs", "shared_memory.jsonl")
+    _snapshot_file = os.path.join("output_logs", "shared_memory.json")
+    _file_handle = None
     logs = []
+    # Entries not yet written to _log_file; they are written together once _flush_threshold
+    # entries are pending, on close(), or at interpreter exit.
+    _pending = []
+    _flush_threshold = 32
+    _flush_registered = False
+    # conversation_id -> entries of that conversation, kept in sync with logs
+    _by_id = {}
+    # (epoch second, formatted stamp) of the last fallback conversation ID, see _now_str()
+    _stamp = (None, "")
 
     @staticmethod
     def initialize():
@@ -21,58 +42,185 @@ class SharedMemory:
         log_dir = os.path.dirname(SharedMemory._log_file)
         if log_dir and not os.path.exists(log_dir):
             os.makedirs(log_dir, exist_ok=True)
-            logger.info(f"Created log directory: {log_dir}")
+            logger.info("Created log directory: %s", log_dir)
 
         if os.path.exists(SharedMemory._log_file):
             try:
-                with open(SharedMemory._log_file, 'r', encoding='utf-8') as f:
-                    SharedMemory.logs = json.load(f)
-                logger.info(f"Loaded {len(SharedMemory.logs)} log entries from {SharedMemory._log_file}")
-            except json.JSONDecodeError:
+                with open(SharedMemory._log_file, 'rb') as f:
+                    SharedMemory.logs = [json_utils.loads(line) for line in f if line.strip()]
+                logger.info("Loaded %d log entries from %s", len(SharedMemory.logs), SharedMemory._log_file)
+            except json_utils.JSONDecodeError:
+                logger.warning("Failed to decode log file JSON. Initializing with empty logs.")
+                SharedMemory.logs = []
+            except Exception as e:
+                logger.error("Error reading log file: %s", e)
+                SharedMemory.logs = []
+        elif os.path.exists(SharedMemory._snapshot_file):
+            # Logs written before the JSON Lines layout are a single JSON array.
+            try:
+                SharedMemory.logs = json_utils.load_file(SharedMemory._snapshot_file)
+                logger.info("Loaded %d log entries from %s", len(SharedMemory.logs), SharedMemory._snapshot_file)
+                # Carry the history over to the JSON Lines file before anything is appended to
+                # it; from then on only that file is read.
+                if SharedMemory.logs:
+                    SharedMemory._append_to_file(SharedMemory.logs)
+                    logger.info("Migrated %d log entries to %s", len(SharedMemory.logs), SharedMemory._log_file)
+            except json_utils.JSONDecodeError:
                 logger.warning("Failed to decode log file JSON. Initializing with empty logs.")
                 SharedMemory.logs = []
             except Exception as e:
-                logger.error(f"Error reading log file: {e}")
+                logger.error("Error reading log file: %s", e)
                 SharedMemory.logs = []
         else:
             logger.info("No existing log file found. Starting with empty logs.")
 
+        SharedMemory._by_id = {}
+        SharedMemory._index(SharedMemory.logs)
+        SharedMemory._register_flush()
+
     @staticmethod
     def store_result(data: Dict[str, Any]):
         """
         Add a single log entry to memory. Requires a 'conversation_id' key.
         """
         if not isinstance(data, dict):
-            logger.error(f"Invalid data type: {type(data)}. Expected a dictionary.")
+            logger.error("Invalid data type: %s. Expected a dictionary.", type(data))
             return
 
         if 'conversation_id' not in data:
             logger.warning("Missing 'conversation_id'. Assigning fallback ID.")
-            data['conversation_id'] = f"generic_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            data['conversation_id'] = f"generic_{SharedMemory._now_str()}"
 
         SharedMemory.logs.append(data)
-        logger.info(f"Appended log for conversation_id: {data.get('conversation_id')}. Total logs: {len(SharedMemory.logs)}")
+        SharedMemory._index([data])
+        SharedMemory._queue_for_file([data])
+        logger.info("Appended log for conversation_id: %s. Total logs: %d", data.get('conversation_id'), len(SharedMemory.logs))
+
+    @staticmethod
+    def store_result_batch(results: List[Dict[str, Any]]):
+        """
+        Add several log entries to memory in one step. Entries follow the same rules as
+        store_result; invalid ones are skipped.
+        """
+        valid = []
+        for data in results:
+            if not isinstance(data, dict):
+                logger.error("Invalid data type: %s. Expected a dictionary.", type(data))
+                continue
+            if 'conversation_id' not in data:
+                logger.warning("Missing 'conversation_id'. Assigning fallback ID.")
+                data['conversation_id'] = f"generic_{SharedMemory._now_str()}"
+            valid.append(data)
+
+        if not valid:
+            return
+
+        SharedMemory.logs.extend(valid)
+        SharedMemory._index(valid)
+        SharedMemory._queue_for_file(valid)
+        logger.info("Appended %d logs in one batch. Total logs: %d", len(valid), len(SharedMemory.logs))
+
+    @staticmethod
+    def _now_str() -> str:
+        """
+        Return the local time as %Y%m%d_%H%M%S, formatting it at most once per second.
+        """
+        second = int(time.time())
+        cached_second, text = SharedMemory._stamp
+        if second != cached_second:
+            text = time.strftime('%Y%m%d_%H%M%S', time.localtime(second))
+            SharedMemory._stamp = (second, text)
+        return text
+
+    @staticmethod
+    def _index(entries: List[Dict[str, Any]]):
+        """
+        Add entries to the conversation_id index.
+        """
+        by_id = SharedMemory._by_id
+        for entry in entries:
+            by_id.setdefault(entry.get('conversation_id'), []).append(entry)
+
+    @staticmethod
+    def _register_flush():
+        """
+        Make sure pending entries are written at interpreter exit. Registered only once.
+        """
+        if not SharedMemory._flush_registered:
+            atexit.register(SharedMemory._flush)
+            SharedMemory._flush_registered = True
+
+    @staticmethod
+    def _queue_for_file(entries: List[Dict[str, Any]]):
+        """
+        Buffer entries for the log file and flush once enough of them are pending.
+        """
+        SharedMemory._register_flush()
+        SharedMemory._pending.extend(entries)
+        if len(SharedMemory._pending) >= SharedMemory._flush_threshold:
+            SharedMemory._flush()
+
+    @staticmethod
+    def _flush():
+        """
+        Write all pending entries to the log file in a single write.
+        """
+        if SharedMemory._pending:
+            pending, SharedMemory._pending = SharedMemory._pending, []
+            SharedMemory._append_to_file(pending)
+
+    @staticmethod
+    def _append_to_file(entries: List[Dict[str, Any]]):
+        """
+        Append log entries to the JSON Lines file. The file is opened once in append mode and
+        the handle is kept on the class; it is flushed after every write.
+        """
+        try:
+            if SharedMemory._file_handle is None:
+                log_dir = os.path.dirname(SharedMemory._log_file)
+                if log_dir:
+                    os.makedirs(log_dir, exist_ok=True)
+                SharedMemory._file_handle = open(SharedMemory._log_file, 'a', encoding='utf-8')
+            SharedMemory._file_handle.write(
+                "".join(json_utils.dumps(entry) + "\n" for entry in entries)
+            )
+            SharedMemory._file_handle.flush()
+        except IOError as e:
+            logger.error("I/O error during save: %s", e)
+        except Exception as e:
+            logger.error("Unexpected error during save: %s", e)
+
+    @staticmethod
+    def close():
+        """
+        Flush pending entries and close the cached log file handle. A later store reopens it.
+        """
+        SharedMemory._flush()
+        if SharedMemory._file_handle is not None:
+            SharedMemory._file_handle.close()
+            SharedMemory._file_handle = None
 
     @staticmethod
-    def _save_to_file():
+    def _compact():
         """
-        Persist in-memory log data to the JSON file.
+        Write the full in-memory history as one indented JSON array to the snapshot file.
+        Only done on request; regular stores just append to the JSON Lines file.
         """
         try:
-            with open(SharedMemory._log_file, 'w', encoding='utf-8') as f:
-                json.dump(SharedMemory.logs, f, indent=4)
-            logger.info(f"Saved {len(SharedMemory.logs)} logs to {SharedMemory._log_file}")
+            with open(SharedMemory._snapshot_file, 'w', encoding='utf-8') as f:
+                f.write(json_utils.dumps(SharedMemory.logs, indent=True))
+            logger.info("Saved %d logs to %s", len(SharedMemory.logs), SharedMemory._snapshot_file)
         except IOError as e:
-            logger.error(f"I/O error during save: {e}")
+            logger.error("I/O error during save: %s", e)
         except Exception as e:
-            logger.error(f"Unexpected error during save: {e}")
+            logger.error("Unexpected error during save: %s", e)
 
     @staticmethod
     def get_conversation_results(conversation_id: str) -> List[Dict[str, Any]]:
         """
         Retrieve all logs matching a specific conversation ID.
         """
-        return [entry for entry in SharedMemory.logs if entry.get('conversation_id') == conversation_id]
+        return list(SharedMemory._by_id.get(conversation_id, ()))
 
     @staticmethod
     def get_all_results() -> List[Dict[str, Any]]:
@@ -92,7 +240,7 @@ if __name__ == "__main__":
     # Remove previous log file for clean testing
     if os.path.exists(SharedMemory._log_file):
         os.remove(SharedMemory._log_file)
-        logger.info(f"Removed existing log file: {SharedMemory._log_file}")
+        logger.info("Removed existing log file: %s", SharedMemory._log_file)
 
     SharedMemory.initialize()
 
@@ -112,9 +260,9 @@ if __name__ == "__main__":
     print("\n--- Results for conv_001 ---")
     conv1_results = SharedMemory.get_conversation_results('conv_001')
     print(f"Results for 'conv_001': {len(conv1_results)} entries")
-    print(json.dumps(conv1_results, indent=2))
+    print(json_utils.dumps(conv1_results, indent=True))
 
-    SharedMemory._save_to_file()
+    SharedMemory.close()
     print(f"\nResults saved to {SharedMemory._log_file}")
 
     print("\n--- Re-initializing SharedMemory to load from file ---")
@@ -122,7 +270,7 @@ if __name__ == "__main__":
     SharedMemory.initialize()
     reloaded_results = SharedMemory.get_all_results()
     print(f"Total results after re-initialization: {len(reloaded_results)}")
-    print(json.dumps(reloaded_results, indent=2))
+    print(json_utils.dumps(reloaded_results, indent=True))
 
     print("\n--- Testing with invalid data type ---")
     SharedMemory.store_result("this is a string, not a dict")
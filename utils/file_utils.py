@@ -1,42 +1,87 @@
-import json
 import pdfplumber
 import logging
 import os
-from typing import Optional, Dict, Any
+import stat
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _PROJECT_ROOT not in sys.path:
+    sys.path.append(_PROJECT_ROOT)
+
+from utils import json_utils
+
 logger = logging.getLogger(__name__)
 
-def validate_file_path(file_path: str) -> bool:
+# Optional: PyMuPDF extracts plain text far faster than pdfplumber; pdfplumber is the fallback.
+_pymupdf_available = False
+try:
+    import pymupdf
+    _pymupdf_available = True
+except ImportError:
+    logger.info("PyMuPDF not installed; load_pdf_text will use pdfplumber.")
+
+# PDFs with at least this many pages are extracted in parallel by up to MAX_EXTRACTION_WORKERS
+# processes; smaller ones are not worth the process start-up.
+PARALLEL_PAGE_THRESHOLD = 32
+MAX_EXTRACTION_WORKERS = min(8, os.cpu_count() or 1)
+
+def _extract_page_range(pdf_path: str, start: int, stop: int) -> List[Optional[str]]:
     """
-    Check if the given path exists and is a valid file.
+    Extract the text of pages [start, stop) of a PDF in a worker process.
+    Each worker opens the file itself, since pdfplumber pages share their document's parser.
     """
-    if not os.path.exists(file_path):
+    with pdfplumber.open(pdf_path) as pdf:
+        return [page.extract_text() for page in pdf.pages[start:stop]]
+
+def _stat_file(file_path: str) -> Optional[os.stat_result]:
+    """
+    Stat the given path once; return the result if it is a regular file, otherwise log why not.
+    """
+    try:
+        st = os.stat(file_path)
+    except (FileNotFoundError, NotADirectoryError):
         logger.error(f"File does not exist: {file_path}")
-        return False
-    if not os.path.isfile(file_path):
+        return None
+    except (OSError, ValueError) as e:
+        logger.error(f"File does not exist: {file_path} ({e})")
+        return None
+    if not stat.S_ISREG(st.st_mode):
         logger.error(f"Path is not a file: {file_path}")
-        return False
+        return None
     logger.debug(f"File path validated: {file_path}")
-    return True
+    return st
+
+def validate_file_path(file_path: str) -> bool:
+    """
+    Check if the given path exists and is a valid file.
+    """
+    return _stat_file(file_path) is not None
 
 def get_file_info(file_path: str) -> Dict[str, Any]:
     """
     Return metadata for a given file path including size and modification timestamp.
     """
-    info = {
-        'exists': False,
-        'size_bytes': None,
-        'last_modified_timestamp': None,
-        'last_modified_datetime': None
+    try:
+        st = os.stat(file_path)
+    except (OSError, ValueError):
+        st = None
+    if st is None or not stat.S_ISREG(st.st_mode):
+        return {
+            'exists': False,
+            'size_bytes': None,
+            'last_modified_timestamp': None,
+            'last_modified_datetime': None
+        }
+    return {
+        'exists': True,
+        'size_bytes': st.st_size,
+        'last_modified_timestamp': st.st_mtime,
+        'last_modified_datetime': datetime.fromtimestamp(st.st_mtime).isoformat()
     }
-    if os.path.exists(file_path) and os.path.isfile(file_path):
-        info['exists'] = True
-        info['size_bytes'] = os.path.getsize(file_path)
-        last_mod_ts = os.path.getmtime(file_path)
-        info['last_modified_timestamp'] = last_mod_ts
-        info['last_modified_datetime'] = datetime.fromtimestamp(last_mod_ts).isoformat()
-    return info
 
 def load_json(file_path: str) -> Dict[str, Any]:
     """
@@ -45,14 +90,13 @@ def load_json(file_path: str) -> Dict[str, Any]:
     try:
         if not validate_file_path(file_path):
             raise FileNotFoundError(f"File does not exist or is not a file: {file_path}")
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            logger.info(f"Successfully loaded JSON from: {file_path}")
-            return data
+        data = json_utils.load_file(file_path)
+        logger.info(f"Successfully loaded JSON from: {file_path}")
+        return data
     except FileNotFoundError as e:
         logger.error(f"Error loading JSON: {e}")
         raise
-    except json.JSONDecodeError as e:
+    except json_utils.JSONDecodeError as e:
         logger.error(f"Invalid JSON format in {file_path}: {e}")
         raise
     except Exception as e:
@@ -64,12 +108,12 @@ def load_text(file_path: str) -> str:
     Load and return plain text content from a file.
     """
     try:
-        if not validate_file_path(file_path):
+        st = _stat_file(file_path)
+        if st is None:
             raise FileNotFoundError(f"File does not exist or is not a file: {file_path}")
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            logger.info(f"Successfully loaded text from: {file_path}")
-            return content
+        content = _read_text_cached(file_path, st.st_mtime_ns, st.st_size)
+        logger.info(f"Successfully loaded text from: {file_path}")
+        return content
     except FileNotFoundError as e:
         logger.error(f"Error loading text: {e}")
         raise
@@ -77,31 +121,108 @@ def load_text(file_path: str) -> str:
         logger.error(f"Unexpected error while loading text from {file_path}: {e}")
         raise
 
+# Loaded file contents are memoized per (path, mtime, size): a modified file gets a new key
+# and is read again. Only immutable str results are cached; load_json is not cached because
+# callers would share (and could mutate) the same parsed dict.
+
+@lru_cache(maxsize=128)
+def _read_text_cached(file_path: str, mtime_ns: int, size: int) -> str:
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+@lru_cache(maxsize=128)
+def _extract_pdf_text_cached(pdf_path: str, mtime_ns: int, size: int) -> Optional[str]:
+    return _extract_pdf_text(pdf_path)
+
+def pdf_text_extractor() -> str:
+    """
+    Return the name of the extractor tried first for PDF text: "pymupdf" if installed, otherwise
+    "pdfplumber". Results derived from the extracted text can be keyed on it.
+    """
+    return "pymupdf" if _pymupdf_available else "pdfplumber"
+
+def pymupdf_page_texts(pdf_path: str) -> Optional[List[str]]:
+    """
+    Return the text of every page using PyMuPDF, or None if PyMuPDF is not installed or could
+    not read the file (callers then fall back to `pdfplumber_page_texts`).
+    """
+    if not _pymupdf_available:
+        return None
+    try:
+        with pymupdf.open(pdf_path) as doc:
+            return [page.get_text("text") for page in doc]
+    except Exception as e:
+        logger.warning(f"PyMuPDF extraction failed for {pdf_path}: {e}. Falling back to pdfplumber.")
+        return None
+
+def pdfplumber_page_texts(pdf_path: str, pages=None, parallel_threshold: int = PARALLEL_PAGE_THRESHOLD,
+                          max_workers: int = MAX_EXTRACTION_WORKERS) -> List[Optional[str]]:
+    """
+    Return the text of every page using pdfplumber. Documents of `parallel_threshold` pages or
+    more are split into contiguous page ranges extracted by up to `max_workers` processes
+    (pdfminer's layout analysis is CPU-bound Python). `pages` may be the pages of an already
+    open handle for `pdf_path`, which are then used instead of opening the file again.
+    """
+    if pages is None:
+        with pdfplumber.open(pdf_path) as pdf:
+            return pdfplumber_page_texts(pdf_path, pdf.pages, parallel_threshold, max_workers)
+
+    page_count = len(pages)
+    workers = min(max_workers, page_count)
+    if page_count < parallel_threshold or workers < 2:
+        return [page.extract_text() for page in pages]
+
+    # Split the document into one contiguous page range per worker.
+    chunk_size = -(-page_count // workers)
+    starts = range(0, page_count, chunk_size)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunks = executor.map(
+            _extract_page_range,
+            [pdf_path] * len(starts),
+            starts,
+            [min(start + chunk_size, page_count) for start in starts],
+        )
+        return [page_text for chunk in chunks for page_text in chunk]
+
+def _extract_pdf_text(pdf_path: str) -> Optional[str]:
+    """
+    Return the page-marked text of a PDF, or None if it has no pages or no readable text.
+    """
+    page_texts = pymupdf_page_texts(pdf_path)
+    if page_texts is not None:
+        page_texts = [page_text.rstrip() for page_text in page_texts]
+    else:
+        page_texts = pdfplumber_page_texts(pdf_path)
+    if not page_texts:
+        logger.warning(f"No pages found in PDF: {pdf_path}")
+        return None
+
+    parts = []
+    for page_num, page_text in enumerate(page_texts, 1):
+        if page_text:
+            parts.append(f"\n--- Page {page_num} ---\n")
+            parts.append(page_text)
+    text = ''.join(parts).strip()
+
+    if not text:
+        logger.warning(f"No readable text extracted from PDF: {pdf_path}")
+        return None
+    return text
+
 def load_pdf_text(pdf_path: str) -> Optional[str]:
     """
-    Extract and return text from a PDF file using pdfplumber.
+    Extract and return text from a PDF file using PyMuPDF if installed, otherwise pdfplumber.
+    Results are cached until the file's modification time or size changes.
     """
-    text = ''
     try:
-        if not validate_file_path(pdf_path):
+        st = _stat_file(pdf_path)
+        if st is None:
             raise FileNotFoundError(f"PDF file does not exist or is not a file: {pdf_path}")
-        
-        with pdfplumber.open(pdf_path) as pdf:
-            if len(pdf.pages) == 0:
-                logger.warning(f"No pages found in PDF: {pdf_path}")
-                return None
-            
-            for page_num, page in enumerate(pdf.pages, 1):
-                page_text = page.extract_text()
-                if page_text:
-                    text += f"\n--- Page {page_num} ---\n" + page_text
-            
-        if not text.strip():
-            logger.warning(f"No readable text extracted from PDF: {pdf_path}")
-            return None
-
-        logger.info(f"Successfully extracted text from PDF: {pdf_path}")
-        return text.strip()
+
+        text = _extract_pdf_text_cached(pdf_path, st.st_mtime_ns, st.st_size)
+        if text is not None:
+            logger.info(f"Successfully extracted text from PDF: {pdf_path}")
+        return text
     except FileNotFoundError as e:
         logger.error(f"Error extracting PDF text: {e}")
         raise
@@ -118,7 +239,7 @@ def save_json(data: Dict[str, Any], file_path: str):
         if dir_name:
             os.makedirs(dir_name, exist_ok=True)
         with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4)
+            f.write(json_utils.dumps(data, indent=True))
         logger.info(f"JSON data saved to {file_path}")
     except Exception as e:
         logger.error(f"Error saving JSON to {file_path}: {e}")
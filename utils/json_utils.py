@@ -0,0 +1,72 @@
+import json
+import logging
+import mmap
+import os
+from typing import Any, Callable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# orjson is an optional, faster drop-in for the standard json module. Its
+# JSONDecodeError subclasses json.JSONDecodeError, so callers can keep catching
+# the standard exception regardless of which backend is active.
+_orjson_available = False
+try:
+    import orjson
+    _orjson_available = True
+    logger.info("orjson available; using it for JSON parsing and serialization.")
+except ImportError:
+    logger.info("orjson not installed; falling back to the standard json module.")
+
+JSONDecodeError = json.JSONDecodeError
+
+# Files larger than this are memory-mapped and parsed in place (orjson only) instead of
+# being copied into a bytes object first.
+MMAP_THRESHOLD = 64 * 1024
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """
+    Parse a JSON document from a string or bytes.
+
+    Bytes are parsed directly by orjson without an intermediate decode.
+    """
+    if _orjson_available:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps(obj: Any, indent: bool = False, default: Optional[Callable[[Any], Any]] = None) -> str:
+    """
+    Serialize an object to a JSON string.
+
+    With `indent=True` the output is pretty-printed (orjson always uses two spaces).
+    `default` is called for objects that are not natively serializable.
+    """
+    if _orjson_available:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(obj, default=default, option=option).decode('utf-8')
+    return json.dumps(obj, indent=2 if indent else None, default=default, ensure_ascii=False)
+
+def dumps_bytes(obj: Any) -> bytes:
+    """
+    Serialize an object to compact UTF-8 encoded JSON, e.g. for an HTTP request body.
+    """
+    if _orjson_available:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def load_file(file_path: str, mmap_threshold: int = MMAP_THRESHOLD) -> Any:
+    """
+    Parse a JSON document from a file.
+
+    With orjson, files larger than `mmap_threshold` bytes are memory-mapped and parsed
+    straight from the mapping, so the kernel pages the data in on demand and no full
+    copy of the file is made. Smaller files (and the stdlib backend) use a plain read().
+    """
+    with open(file_path, 'rb') as f:
+        if _orjson_available and os.fstat(f.fileno()).st_size > mmap_threshold:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    return orjson.loads(view)
+                finally:
+                    view.release()
+        return loads(f.read())
@@ -1,11 +1,481 @@
 import requests
+import asyncio
+import atexit
+import functools
+import hashlib
 import logging
 import json
-from typing import Optional
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Dict, Any, Union
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+from urllib3.exceptions import ReadTimeoutError
+from urllib3.util.retry import Retry
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _PROJECT_ROOT not in sys.path:
+    sys.path.append(_PROJECT_ROOT)
+
+from utils import json_utils
+from utils.semantic_cache import SemanticCache
 
 logger = logging.getLogger(__name__)
 
-def call_ollama_llm(prompt: str, model: str = "mistral:latest", timeout: int = 180) -> Optional[str]:
+# Optional Prometheus export of the call metrics (see get_llm_metrics).
+_prometheus_available = False
+try:
+    from prometheus_client import Counter, Histogram
+    _prometheus_available = True
+except ImportError:
+    pass
+
+# Shared session for callers that do not pass their own: keeps connections to Ollama alive
+# between calls. The pool holds up to OLLAMA_POOL_SIZE connections per host, so that many
+# threads can call concurrently without discarding connections.
+_POOL_SIZE = max(1, int(os.getenv("OLLAMA_POOL_SIZE", "32")))
+# Transient failures (refused/reset connections, 502/503/504 while a model loads or a proxy
+# restarts) are retried with exponential backoff (0.5s, 1s, 2s). A read timeout is retried only
+# once, since each attempt may already have waited the full timeout. After the last status
+# retry the response is returned as is, so raise_for_status() reports the HTTP error.
+_RETRY = Retry(total=3, connect=3, read=1, status=3, backoff_factor=0.5,
+               status_forcelist=(502, 503, 504), allowed_methods=frozenset({"POST"}),
+               raise_on_status=False)
+# A local Ollama can also be reached through its Unix domain socket (OLLAMA_SOCKET), which skips
+# the loopback TCP stack and cannot run out of ephemeral ports under heavy concurrency.
+_OLLAMA_SOCKET = os.getenv("OLLAMA_SOCKET", "")
+
+class _UnixSocketConnection(HTTPConnection):
+    """HTTP connection that talks to the Ollama socket instead of the URL's host and port."""
+
+    def _new_conn(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout if isinstance(self.timeout, (int, float)) else None)
+        try:
+            sock.connect(_OLLAMA_SOCKET)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+class _UnixSocketConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _UnixSocketConnection
+
+class _UnixSocketAdapter(HTTPAdapter):
+    """Adapter whose http:// connections all go through the OLLAMA_SOCKET socket."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _UnixSocketConnectionPool}
+
+def new_ollama_adapter(pool_connections: int = 10, pool_maxsize: int = _POOL_SIZE,
+                       retry_read_timeouts: bool = True) -> HTTPAdapter:
+    """
+    Return a transport adapter for sessions that talk to Ollama, such as the agents' own
+    sessions passed to `call_ollama_llm`. Transient failures are retried as described for
+    _RETRY; callers with their own timeout retry pass `retry_read_timeouts=False` so a read
+    timeout is not retried twice over. With OLLAMA_SOCKET set it connects through the socket.
+    """
+    adapter_class = _UnixSocketAdapter if _OLLAMA_SOCKET else HTTPAdapter
+    retry = _RETRY if retry_read_timeouts else _RETRY.new(read=0)
+    return adapter_class(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+
+_session = requests.Session()
+_session.mount("http://", new_ollama_adapter())
+# Headers for every session that talks to Ollama (the agents' sessions use them too).
+# Compressed responses only pay off over a real network link. For a local server (the default)
+# ask for identity encoding so no time is spent decompressing; set OLLAMA_REMOTE=1 otherwise.
+OLLAMA_HEADERS = {
+    "Connection": "keep-alive",
+    "Accept-Encoding": "gzip, deflate" if os.getenv("OLLAMA_REMOTE") == "1" else "identity",
+}
+_session.headers.update(OLLAMA_HEADERS)
+
+# Ollama servers to send requests to, from OLLAMA_URLS (comma-separated base URLs). With several
+# nodes each call goes to the less busy of two randomly picked ones (power of two choices), and
+# a node that refuses connections is skipped for _NODE_COOLDOWN_SECONDS. With OLLAMA_SOCKET set
+# there is a single local server, so OLLAMA_URLS is ignored.
+_OLLAMA_URLS = [url.strip().rstrip("/") for url in os.getenv("OLLAMA_URLS", "http://localhost:11434").split(",")
+                if url.strip() and not _OLLAMA_SOCKET] or ["http://localhost:11434"]
+_NODE_COOLDOWN_SECONDS = 5.0
+_node_inflight = dict.fromkeys(_OLLAMA_URLS, 0)
+_node_down_until = dict.fromkeys(_OLLAMA_URLS, 0.0)
+_node_lock = threading.Lock()
+
+def _acquire_node(exclude: List[str]) -> str:
+    """Pick a node for the next request and count it as in flight there."""
+    with _node_lock:
+        now = time.monotonic()
+        candidates = [url for url in _OLLAMA_URLS if url not in exclude]
+        healthy = [url for url in candidates if _node_down_until[url] <= now]
+        candidates = healthy or candidates or _OLLAMA_URLS
+        if len(candidates) > 1:
+            first, second = random.sample(candidates, 2)
+            node = first if _node_inflight[first] <= _node_inflight[second] else second
+        else:
+            node = candidates[0]
+        _node_inflight[node] += 1
+        return node
+
+def _release_node(node: str, failed: bool = False) -> None:
+    """Count a request on `node` as finished; a failed node is skipped for a while."""
+    with _node_lock:
+        _node_inflight[node] -= 1
+        if failed:
+            _node_down_until[node] = time.monotonic() + _NODE_COOLDOWN_SECONDS
+
+# Futures of the requests currently being generated, by cache key (see call_ollama_llm).
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+# Without an explicit limit, the number of tokens generated scales with the prompt: a short
+# question gets a short budget, and prompts of _NUM_PREDICT_FULL_WORDS words or more get the full
+# _NUM_PREDICT_MAX. Generation time grows linearly with the tokens produced.
+_NUM_PREDICT_BASE = 64
+_NUM_PREDICT_MAX = 512
+_NUM_PREDICT_FULL_WORDS = (_NUM_PREDICT_MAX - _NUM_PREDICT_BASE) // 2
+
+def _default_num_predict(prompt: str) -> int:
+    """Token budget for a prompt: 64 plus two tokens per word, capped at 512."""
+    # maxsplit bounds the work on long prompts, which get the full budget anyway.
+    words = len(prompt.split(None, _NUM_PREDICT_FULL_WORDS))
+    return min(_NUM_PREDICT_MAX, _NUM_PREDICT_BASE + 2 * words)
+
+# Call metrics for profiling, returned by get_llm_metrics() and also exported to Prometheus
+# when prometheus_client is installed.
+_metrics = {
+    "requests": 0,
+    "failures": 0,
+    "node_failovers": 0,
+    "cache_hits": 0,
+    "cache_misses": 0,
+    "shared_inflight": 0,
+    "latency_seconds": 0.0,
+    "streamed_requests": 0,
+    "first_token_seconds": 0.0,
+    "eval_tokens": 0,
+    "eval_seconds": 0.0,
+}
+_metrics_lock = threading.Lock()
+
+if _prometheus_available:
+    _prom_latency = Histogram("ollama_latency_seconds", "Duration of successful Ollama generate requests.")
+    _prom_cache_hits = Counter("ollama_cache_hits_total", "LLM calls answered from a cache.")
+    _prom_cache_misses = Counter("ollama_cache_misses_total", "Cacheable LLM calls that had to be generated.")
+    _prom_failures = Counter("ollama_failures_total", "Ollama generate requests that failed.")
+    _prom_eval_tokens = Counter("ollama_eval_tokens_total", "Tokens generated by Ollama.")
+
+def _count(name: str) -> None:
+    """Increment one of the call counters."""
+    with _metrics_lock:
+        _metrics[name] += 1
+    if _prometheus_available:
+        if name == "cache_hits":
+            _prom_cache_hits.inc()
+        elif name == "cache_misses":
+            _prom_cache_misses.inc()
+        elif name == "failures":
+            _prom_failures.inc()
+
+def _record_generation(latency: float, first_token: Optional[float], stats: Dict[str, Any]) -> None:
+    """Record a successful request from its latency and Ollama's final eval_count/eval_duration."""
+    tokens = stats.get("eval_count") or 0
+    eval_seconds = (stats.get("eval_duration") or 0) / 1e9
+    with _metrics_lock:
+        _metrics["requests"] += 1
+        _metrics["latency_seconds"] += latency
+        if first_token is not None:
+            _metrics["streamed_requests"] += 1
+            _metrics["first_token_seconds"] += first_token
+        _metrics["eval_tokens"] += tokens
+        _metrics["eval_seconds"] += eval_seconds
+    if _prometheus_available:
+        _prom_latency.observe(latency)
+        _prom_eval_tokens.inc(tokens)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("LLM request took %.2fs (%d tokens, %.1f tokens/s)",
+                     latency, tokens, tokens / eval_seconds if eval_seconds else 0.0)
+
+def get_llm_metrics() -> Dict[str, Any]:
+    """
+    Return a snapshot of the LLM call metrics collected since the module was loaded.
+
+    Besides the raw counters and totals, the snapshot includes the average latency, average
+    time to first token of streamed requests, generation speed (tokens/s) and cache hit rate.
+    """
+    with _metrics_lock:
+        snapshot = dict(_metrics)
+    lookups = snapshot["cache_hits"] + snapshot["cache_misses"]
+    snapshot["avg_latency_seconds"] = snapshot["latency_seconds"] / snapshot["requests"] if snapshot["requests"] else 0.0
+    snapshot["avg_first_token_seconds"] = (snapshot["first_token_seconds"] / snapshot["streamed_requests"]
+                                           if snapshot["streamed_requests"] else 0.0)
+    snapshot["tokens_per_second"] = snapshot["eval_tokens"] / snapshot["eval_seconds"] if snapshot["eval_seconds"] else 0.0
+    snapshot["cache_hit_rate"] = snapshot["cache_hits"] / lookups if lookups else 0.0
+    return snapshot
+
+# Request bodies are serialized with json_utils (orjson when installed) and posted as raw data.
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+def close_session() -> None:
+    """Close the pooled connections of the shared session."""
+    _session.close()
+
+atexit.register(close_session)
+
+# Successful responses are cached, keyed by a hash of the model, prompt, options and format:
+# in memory (LRU, _LLM_MEMORY_CACHE_MAX entries) and, when OLLAMA_CACHE_DIR names a directory,
+# on disk, one file per request. The disk cache is opt-in because a sampled answer (temperature
+# above 0) would otherwise be replayed by every later run.
+_LLM_CACHE_DIR = os.environ.get("OLLAMA_CACHE_DIR", "")
+_LLM_CACHE_TTL_SECONDS = 7 * 86400
+_LLM_MEMORY_CACHE_MAX = 512
+_llm_memory_cache: "OrderedDict[str, str]" = OrderedDict()
+_llm_memory_cache_lock = threading.Lock()
+
+# Opt-in similarity caches (see `semantic_cache` in call_ollama_llm), one per model, options
+# and format combination so that only requests that would be generated alike can share answers.
+_semantic_caches: Dict[str, SemanticCache] = {}
+_semantic_caches_lock = threading.Lock()
+
+class _JsonEndDetector:
+    """
+    Incrementally tracks bracket depth of streamed text to spot the end of the first JSON value.
+
+    Brackets inside string literals (including escaped quotes) are ignored, so the detector
+    only fires once the outermost object or array has actually been closed.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, chunk: str) -> bool:
+        """Consume the next piece of text; return True once the top-level JSON value is complete."""
+        for char in chunk:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                self.depth += 1
+                self.started = True
+            elif char in '}]':
+                self.depth -= 1
+                if self.started and self.depth <= 0:
+                    return True
+        return False
+
+def _read_streamed_response(response: requests.Response, stop_after_json: bool,
+                            on_token: Optional[Callable[[str], None]] = None,
+                            stats: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Concatenate the tokens of a streamed Ollama response.
+
+    Ollama streams one JSON object per line, each carrying a `response` fragment and a
+    `done` flag. With `stop_after_json`, reading stops as soon as the first complete JSON
+    value has been generated; closing the response then aborts the remaining generation.
+    Each non-empty fragment is passed to `on_token` as soon as it arrives. If given, `stats`
+    receives the arrival time of the first fragment (`first_token_at`, a perf_counter value)
+    and the timing fields of the final chunk.
+    """
+    detector = _JsonEndDetector() if stop_after_json else None
+    parts = []
+    try:
+        for line in response.iter_lines(chunk_size=4096):
+            if not line:
+                continue
+            chunk = json_utils.loads(line)
+            fragment = chunk.get("response", "")
+            if stats is not None and not parts:
+                stats["first_token_at"] = time.perf_counter()
+            parts.append(fragment)
+            if on_token is not None and fragment:
+                on_token(fragment)
+            if chunk.get("done"):
+                if stats is not None:
+                    stats.update(chunk)
+                break
+            if detector is not None and detector.feed(fragment):
+                logger.debug("Complete JSON value received; closing the LLM stream early.")
+                break
+    finally:
+        response.close()
+    return "".join(parts)
+
+def _llm_cache_key(data: Dict[str, Any], stops_after_json: bool = False) -> str:
+    """
+    Return the cache key for a request payload; everything that shapes the output is hashed,
+    including whether the streamed text is cut off after the first JSON value.
+    """
+    key_material = json.dumps([data["model"], data["prompt"], data["options"], data.get("format"),
+                               stops_after_json], sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(key_material.encode("utf-8"), digest_size=20).hexdigest()
+
+def _get_semantic_cache(data: Dict[str, Any], default_num_predict: bool = False) -> SemanticCache:
+    """
+    Return the similarity cache for the request's model, options and format. A num_predict that
+    was only derived from the prompt length (`default_num_predict`) is left out, since it differs
+    between near-identical prompts.
+    """
+    options = data["options"]
+    if default_num_predict:
+        options = {name: value for name, value in options.items() if name != "num_predict"}
+    key = json.dumps([data["model"], options, data.get("format")], sort_keys=True, separators=(",", ":"))
+    with _semantic_caches_lock:
+        cache = _semantic_caches.get(key)
+        if cache is None:
+            cache = _semantic_caches[key] = SemanticCache(threshold=0.92, max_entries=_LLM_MEMORY_CACHE_MAX)
+        return cache
+
+def _remember_response(key: str, text: str) -> None:
+    """Insert a response into the in-memory LRU, evicting the least recently used entry."""
+    with _llm_memory_cache_lock:
+        _llm_memory_cache[key] = text
+        _llm_memory_cache.move_to_end(key)
+        if len(_llm_memory_cache) > _LLM_MEMORY_CACHE_MAX:
+            _llm_memory_cache.popitem(last=False)
+
+def _load_cached_response(key: str) -> Optional[str]:
+    """Return a cached response, or None if it is missing, expired or unreadable."""
+    with _llm_memory_cache_lock:
+        text = _llm_memory_cache.get(key)
+        if text is not None:
+            _llm_memory_cache.move_to_end(key)
+            return text
+    if not _LLM_CACHE_DIR:
+        return None
+
+    cache_path = os.path.join(_LLM_CACHE_DIR, f"{key}.txt")
+    try:
+        if time.time() - os.path.getmtime(cache_path) > _LLM_CACHE_TTL_SECONDS:
+            return None
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+    except OSError:
+        return None
+    if text:
+        _remember_response(key, text)
+    return text
+
+def _store_cached_response(key: str, text: str) -> None:
+    """Write a response to the caches. Disk failures are logged and otherwise ignored."""
+    _remember_response(key, text)
+    if not _LLM_CACHE_DIR:
+        return
+
+    cache_path = os.path.join(_LLM_CACHE_DIR, f"{key}.txt")
+    tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(_LLM_CACHE_DIR, exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        # Atomic rename, so concurrent readers never see a partially written entry.
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning("Could not write LLM cache entry '%s': %s", cache_path, e)
+
+def is_timeout_error(exc: BaseException) -> bool:
+    """
+    Return True if `exc` is a timeout. requests reports a read timeout in the middle of a
+    streamed body as a ConnectionError wrapping urllib3's ReadTimeoutError, not as a Timeout.
+    """
+    if isinstance(exc, requests.exceptions.Timeout):
+        return True
+    return (isinstance(exc, requests.exceptions.ConnectionError)
+            and bool(exc.args) and isinstance(exc.args[0], ReadTimeoutError))
+
+def _log_llm_error(exc: Exception, url: str, timeout: int, response: Optional[requests.Response],
+                   elapsed: float) -> None:
+    """Log a failed LLM call with its error class and how long it took before failing."""
+    if not logger.isEnabledFor(logging.ERROR):
+        return
+    if is_timeout_error(exc):
+        message = f"Request timed out after {timeout} seconds."
+    elif isinstance(exc, requests.exceptions.ConnectionError):
+        message = f"Connection error: Unable to reach Ollama server at {url}"
+    elif isinstance(exc, requests.exceptions.HTTPError):
+        message = f"HTTP error {exc.response.status_code}: {exc.response.text}"
+    elif isinstance(exc, requests.exceptions.RequestException):
+        message = f"Unexpected request error: {exc}"
+    elif isinstance(exc, json.JSONDecodeError):
+        message = f"Failed to parse JSON: {exc}. Response: {response.text if response is not None else 'N/A'}"
+    elif isinstance(exc, ValueError):
+        message = f"Invalid response: {exc}"
+    else:
+        message = f"Unhandled exception during LLM call: {exc}"
+    logger.error("%s (%s after %.2fs)", message, type(exc).__name__, elapsed)
+
+def _generate(http, data: Dict[str, Any], timeout: int, stream: bool, stop_after_json: bool,
+              on_token: Optional[Callable[[str], None]]) -> str:
+    """
+    Send a generate request, failing over to another node on connection errors, and return
+    the stripped response text. Errors are logged and re-raised.
+    """
+    body = json_utils.dumps_bytes(data)
+    tried_nodes = []
+    while True:
+        node = _acquire_node(tried_nodes)
+        url = f"{node}/api/generate"
+        node_failed = False
+        response = None
+        started = time.perf_counter()
+        try:
+            logger.info("Calling Ollama LLM with model '%s'", data["model"])
+            response = http.post(url, data=body, headers=_JSON_HEADERS, timeout=timeout, stream=stream)
+            response.raise_for_status()
+            if stream:
+                result = {}
+                text = _read_streamed_response(response, stop_after_json, on_token, result).strip()
+            else:
+                result = json_utils.loads(response.content)
+                text = result.get("response", "").strip()
+
+            if not text:
+                logger.warning("Received empty response from LLM.")
+                raise ValueError("Empty response from LLM.")
+
+            logger.debug("LLM response received successfully.")
+            first_token_at = result.get("first_token_at")
+            _record_generation(time.perf_counter() - started,
+                               first_token_at - started if first_token_at is not None else None, result)
+            return text
+
+        except Exception as e:
+            if isinstance(e, requests.exceptions.ConnectionError) and not is_timeout_error(e):
+                node_failed = True
+                tried_nodes.append(node)
+                if len(tried_nodes) < len(_OLLAMA_URLS):
+                    _count("node_failovers")
+                    logger.warning("Unable to reach Ollama server at %s; trying another node.", url)
+                    continue
+            # A streamed body has already been consumed, so only a buffered one can be shown.
+            _count("failures")
+            _log_llm_error(e, url, timeout, None if stream else response, time.perf_counter() - started)
+            raise
+        finally:
+            _release_node(node, node_failed)
+
+def call_ollama_llm(prompt: str, model: str = "mistral:latest", timeout: int = 180,
+                    session: Optional[requests.Session] = None, stream: bool = True,
+                    stop_after_json: bool = False, options: Optional[Dict[str, Any]] = None,
+                    format: Optional[Union[str, Dict[str, Any]]] = None, keep_alive: Optional[Union[str, int]] = None,
+                    use_cache: bool = True, semantic_cache: bool = False,
+                    on_token: Optional[Callable[[str], None]] = None, max_tokens: Optional[int] = None,
+                    stop: Optional[List[str]] = None) -> Optional[str]:
     """
     Generate a response from the specified Ollama LLM based on the input prompt.
 
@@ -13,6 +483,30 @@ def call_ollama_llm(prompt: str, model: str = "mistral:latest", timeout: int = 1
         prompt (str): Input query for the model.
         model (str): Ollama model identifier.
         timeout (int): Request timeout in seconds.
+        session (Optional[requests.Session]): Session whose pooled keep-alive connections are
+            reused for the request. The module's shared session is used when omitted.
+        stream (bool): Read the response as a token stream instead of waiting for the whole
+            generation to finish (the default).
+        stop_after_json (bool): When streaming, stop as soon as the model has produced one
+            complete JSON object or array, skipping any trailing tokens.
+        options (Optional[Dict[str, Any]]): Ollama generation options (e.g. temperature,
+            num_predict) overriding the defaults.
+        format (Optional[Union[str, Dict[str, Any]]]): Output format constraint: "json" to
+            restrict decoding to valid JSON, or a JSON schema for structured outputs.
+        keep_alive (Optional[Union[str, int]]): How long Ollama keeps the model (and its prompt
+            cache) loaded after the request, e.g. "10m"; -1 keeps it loaded indefinitely.
+        use_cache (bool): Return a cached response (in memory or on disk) for an identical
+            request, and cache new responses (on disk only if OLLAMA_CACHE_DIR is set).
+        semantic_cache (bool): Also return the cached response of a near-identical earlier prompt
+            (cosine similarity >= 0.92) to the same model and options. Only suitable when such
+            prompts are expected to have the same answer, so it is off by default.
+        on_token (Optional[Callable[[str], None]]): Called with each generated text fragment as
+            it arrives; implies streaming. A cached response is passed in a single call.
+        max_tokens (Optional[int]): Maximum number of tokens to generate (Ollama's num_predict).
+            Defaults to 64 plus two per prompt word, capped at 512; a num_predict in `options`
+            takes precedence.
+        stop (Optional[List[str]]): Sequences that end the generation as soon as the model
+            produces one.
 
     Returns:
         Optional[str]: Generated text response or None if failed.
@@ -20,54 +514,133 @@ def call_ollama_llm(prompt: str, model: str = "mistral:latest", timeout: int = 1
     Raises:
         requests.exceptions.RequestException: For network or server errors.
         json.JSONDecodeError: For malformed JSON.
-        ValueError: For missing or empty responses.
+        ValueError: For empty prompts and for missing or empty responses.
     """
-    url = "http://localhost:11434/api/generate"
+    # Nothing useful can be generated for a blank prompt, so skip the round trip.
+    if not prompt or prompt.isspace():
+        logger.warning("Refusing to call the LLM with an empty prompt.")
+        raise ValueError("Empty prompt.")
+
+    if on_token is not None:
+        stream = True
     data = {
         "model": model,
         "prompt": prompt,
-        "stream": False,
+        "stream": stream,
         "options": {
             "temperature": 0.3,
-            "num_predict": 512
+            "num_predict": max_tokens if max_tokens is not None else _default_num_predict(prompt)
         }
     }
+    if stop:
+        data["options"]["stop"] = list(stop)
+    if options:
+        data["options"].update(options)
+    if format:
+        data["format"] = format
+    if keep_alive is not None:
+        data["keep_alive"] = keep_alive
 
-    try:
-        logger.info(f"Calling Ollama LLM with model '{model}'")
-        response = requests.post(url, json=data, timeout=timeout)
-        response.raise_for_status()
-        result = response.json()
-        text = result.get("response", "").strip()
+    # stop_after_json only truncates streamed reads, and a truncated text must not be served to
+    # (or shared with) callers that asked for the full response.
+    cache_key = _llm_cache_key(data, stream and stop_after_json) if use_cache else None
+    if cache_key is not None:
+        cached = _load_cached_response(cache_key)
+        if cached:
+            _count("cache_hits")
+            logger.info("Using cached LLM response for model '%s'", model)
+            if on_token is not None:
+                on_token(cached)
+            return cached
 
-        if not text:
-            logger.warning("Received empty response from LLM.")
-            raise ValueError("Empty response from LLM.")
+    default_num_predict = max_tokens is None and not (options and "num_predict" in options)
+    similar_prompts = _get_semantic_cache(data, default_num_predict) if semantic_cache else None
+    if similar_prompts is not None:
+        hit = similar_prompts.lookup(prompt)
+        if hit is not None:
+            _count("cache_hits")
+            logger.info("Using LLM response cached for a similar prompt for model '%s'", model)
+            if on_token is not None:
+                on_token(hit["response"])
+            return hit["response"]
 
-        logger.info("LLM response received successfully.")
-        return text
+    # Identical requests already in flight share one generation (single-flight): the first
+    # caller performs it and later callers wait for its result or exception.
+    if cache_key is not None or similar_prompts is not None:
+        _count("cache_misses")
+    leader = None
+    if cache_key is not None:
+        with _inflight_lock:
+            pending = _inflight.get(cache_key)
+            if pending is None:
+                leader = _inflight[cache_key] = Future()
+        if pending is not None:
+            _count("shared_inflight")
+            logger.info("Waiting for an identical in-flight LLM request for model '%s'", model)
+            text = pending.result()
+            if on_token is not None:
+                on_token(text)
+            return text
 
-    except requests.exceptions.Timeout:
-        logger.error(f"Request timed out after {timeout} seconds.")
-        raise
-    except requests.exceptions.ConnectionError:
-        logger.error(f"Connection error: Unable to reach Ollama server at {url}")
-        raise
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"HTTP error {e.response.status_code}: {e.response.text}")
-        raise
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Unexpected request error: {e}")
-        raise
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse JSON: {e}. Response: {response.text if 'response' in locals() else 'N/A'}")
-        raise
-    except ValueError as e:
-        logger.error(f"Invalid response: {e}")
-        raise
-    except Exception as e:
-        logger.error(f"Unhandled exception during LLM call: {e}")
+    try:
+        text = _generate(session if session is not None else _session, data, timeout, stream,
+                         stop_after_json, on_token)
+        if cache_key is not None:
+            _store_cached_response(cache_key, text)
+        if similar_prompts is not None:
+            similar_prompts.insert(prompt, {"response": text})
+        if leader is not None:
+            leader.set_result(text)
+        return text
+    except BaseException as e:
+        if leader is not None:
+            leader.set_exception(e)
         raise
+    finally:
+        if leader is not None:
+            with _inflight_lock:
+                _inflight.pop(cache_key, None)
+
+def call_ollama_llm_batch(prompts: List[str], model: str = "mistral:latest", max_concurrency: int = 8,
+                          **kwargs: Any) -> List[Optional[str]]:
+    """
+    Generate responses for several prompts with up to `max_concurrency` requests in flight.
+
+    The calls share the pooled keep-alive connections of the shared session, so their round
+    trips overlap and Ollama can batch the generations (up to its OLLAMA_NUM_PARALLEL slots).
+
+    Args:
+        prompts (List[str]): The prompts to send.
+        model (str): Ollama model identifier.
+        max_concurrency (int): Maximum number of simultaneous requests.
+        **kwargs: Further keyword arguments passed to `call_ollama_llm` for every prompt.
+
+    Returns:
+        List[Optional[str]]: One response per prompt, in input order; None where the call failed
+                             (the error is logged).
+    """
+    def call(prompt: str) -> Optional[str]:
+        try:
+            return call_ollama_llm(prompt, model, **kwargs)
+        except Exception as e:
+            logger.error("Batched LLM call failed: %s", e)
+            return None
+
+    if len(prompts) <= 1 or max_concurrency <= 1:
+        return [call(prompt) for prompt in prompts]
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(prompts))) as executor:
+        return list(executor.map(call, prompts))
+
+async def acall_ollama_llm(prompt: str, model: str = "mistral:latest", **kwargs: Any) -> Optional[str]:
+    """
+    Awaitable variant of `call_ollama_llm` for asyncio code.
+
+    The blocking call runs in the event loop's default executor and uses the shared keep-alive
+    session, so several prompts can be awaited together with `asyncio.gather` without blocking
+    the loop. Accepts the same keyword arguments and raises the same exceptions.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(call_ollama_llm, prompt, model, **kwargs))
 
 if __name__ == "__main__":
     logging.basicConfig(
@@ -96,24 +669,29 @@ if __name__ == "__main__":
             self._json_data = json_data
             self.status_code = status_code
             self.text = json.dumps(json_data)
-        def json(self):
-            return self._json_data
+        @property
+        def content(self):
+            return self.text.encode()
+        def iter_lines(self, chunk_size=512):
+            yield json.dumps(dict(self._json_data, done=True)).encode()
+        def close(self):
+            pass
         def raise_for_status(self):
             if self.status_code >= 400:
                 raise requests.exceptions.HTTPError(response=self)
 
-    original_post = requests.post
+    original_post = _session.post
     def mock_post(*args, **kwargs):
-        if "simulated empty" in kwargs.get("json", {}).get("prompt", ""):
+        if "simulated empty" in json.loads(kwargs.get("data", b"{}")).get("prompt", ""):
             print("[SIMULATED] Returning empty response from Ollama.")
             return MockResponse(200, {"response": ""})
         return original_post(*args, **kwargs)
 
-    requests.post = mock_post
+    _session.post = mock_post
 
     try:
         call_ollama_llm("This is a simulated empty response prompt", model="mistral:latest")
     except ValueError as e:
         print(f"Caught expected error: {e}")
     finally:
-        requests.post = original_post
+        _session.post = original_post
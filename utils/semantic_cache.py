@@ -0,0 +1,126 @@
+import re
+import math
+import logging
+import threading
+from collections import Counter, deque
+from typing import Any, Callable, Dict, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+class SemanticCache:
+    """
+    Similarity-based cache for LLM results of near-duplicate texts.
+
+    Each cached text is represented by a vector; a lookup returns the payload of the most
+    similar cached text if its cosine similarity reaches `threshold`. By default the vector
+    is a bag-of-words term-count vector, which needs no extra dependencies and catches
+    re-sent texts that differ only in whitespace, punctuation, casing or a few words.
+    An `embedder` callable (text -> sequence of floats, e.g. a sentence-transformers model's
+    `encode`) can be supplied for true semantic matching.
+
+    Entries are evicted first-in, first-out once `max_entries` is reached.
+    """
+
+    def __init__(self, threshold: float = 0.92, max_entries: int = 10_000,
+                 embedder: Optional[Callable[[str], Sequence[float]]] = None):
+        """
+        Args:
+            threshold (float): Minimum cosine similarity for a cache hit.
+            max_entries (int): Maximum number of cached texts.
+            embedder (Optional[Callable[[str], Sequence[float]]]): Dense embedding function.
+                Bag-of-words vectors are used when omitted.
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.embedder = embedder
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._order: deque = deque()
+        # entry id -> (vector, norm, payload)
+        self._entries: Dict[int, tuple] = {}
+        # Inverted index for bag-of-words vectors: token -> ids of entries containing it,
+        # so a lookup only scores entries that share at least one token with the query.
+        self._postings: Dict[str, set] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _vectorize(self, text: str):
+        if self.embedder is not None:
+            vector = [float(x) for x in self.embedder(text)]
+            return vector, math.sqrt(sum(x * x for x in vector))
+        vector = Counter(_TOKEN_RE.findall(text.lower()))
+        return vector, math.sqrt(sum(count * count for count in vector.values()))
+
+    def lookup(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Return a copy of the payload cached for the most similar text, or None if no cached
+        text reaches the similarity threshold.
+        """
+        vector, norm = self._vectorize(text)
+        if not norm:
+            return None
+
+        best_score, best_payload = 0.0, None
+        with self._lock:
+            if self.embedder is not None:
+                candidates = self._entries.values()
+            else:
+                ids = set()
+                for token in vector:
+                    ids.update(self._postings.get(token, ()))
+                candidates = [self._entries[entry_id] for entry_id in ids]
+
+            for cached_vector, cached_norm, payload in candidates:
+                if self.embedder is not None:
+                    dot = sum(a * b for a, b in zip(vector, cached_vector))
+                else:
+                    small, large = (vector, cached_vector) if len(vector) <= len(cached_vector) else (cached_vector, vector)
+                    dot = sum(count * large.get(token, 0) for token, count in small.items())
+                score = dot / (norm * cached_norm)
+                if score > best_score:
+                    best_score, best_payload = score, payload
+
+        if best_payload is not None and best_score >= self.threshold:
+            logger.debug("Semantic cache hit (similarity %.3f).", best_score)
+            return dict(best_payload)
+        return None
+
+    def insert(self, text: str, payload: Dict[str, Any]):
+        """
+        Cache a payload for a text, evicting the oldest entry when the cache is full.
+        """
+        vector, norm = self._vectorize(text)
+        if not norm:
+            return
+
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (vector, norm, dict(payload))
+            self._order.append(entry_id)
+            if self.embedder is None:
+                for token in vector:
+                    self._postings.setdefault(token, set()).add(entry_id)
+
+            while len(self._order) > self.max_entries:
+                self._evict(self._order.popleft())
+
+    def _evict(self, entry_id: int):
+        vector, _, _ = self._entries.pop(entry_id)
+        if self.embedder is None:
+            for token in vector:
+                ids = self._postings.get(token)
+                if ids is not None:
+                    ids.discard(entry_id)
+                    if not ids:
+                        del self._postings[token]
+
+    def clear(self):
+        """Remove all cached entries."""
+        with self._lock:
+            self._entries.clear()
+            self._postings.clear()
+            self._order.clear()